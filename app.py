@@ -10,11 +10,25 @@ def create_app(config_class=Config):
     # Initialize Flask extensions
     db.init_app(app)
 
+    # Configure services
+    from services import dictionary, glossary, metrics, offload, profiling, translation, tts, tts_queue, write_behind
+    dictionary.init_app(app)
+    glossary.init_app(app)
+    metrics.init_app(app)
+    profiling.init_app(app)
+    offload.init_app(app)
+    translation.init_app(app)
+    tts.init_app(app)
+    tts_queue.init_app(app)
+    write_behind.init_app(app)
+
     # Register Blueprints
     from routes.main import main_bp
     from routes.api import api_bp
+    from routes.admin import admin_bp
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp)
+    app.register_blueprint(admin_bp)
 
     return app
 
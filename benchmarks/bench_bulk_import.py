@@ -0,0 +1,93 @@
+"""
+Bulk vocabulary import: per-row ORM path vs set-based path.
+
+    python -m benchmarks.bench_bulk_import --sizes 100,1000,5000
+"""
+import argparse
+
+from benchmarks.common import bench_app, timed
+
+
+def generate_items(n):
+    return [
+        {
+            'word': f'Word{i}',
+            'translation': f'Nghĩa {i}',
+            'phonetic': f'/wɜːd{i}/',
+            'example_en': f'This is word{i} in a sentence.',
+            'example_vi': f'Đây là từ {i} trong câu.',
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_import(items):
+    """The previous save_vocabulary_bulk loop: one SELECT and one ORM object per item"""
+    from extensions import db
+    from models import Vocabulary
+
+    saved = []
+    skipped = []
+    for item in items:
+        word = item.get('word', '').strip()
+        translation = item.get('translation', '').strip()
+        if not word or not translation:
+            continue
+        existing = Vocabulary.query.filter_by(word=word.lower()).first()
+        if existing:
+            skipped.append({'word': word, 'reason': 'Already exists'})
+            continue
+        db.session.add(Vocabulary(
+            word=word.lower(),
+            translation=translation,
+            phonetic=item.get('phonetic'),
+            context=item.get('context'),
+            example_en=item.get('example_en'),
+            example_vi=item.get('example_vi'),
+            level=item.get('level')
+        ))
+        saved.append(word)
+    db.session.commit()
+    return saved, skipped
+
+
+def run(app, sizes):
+    from extensions import db
+    from models import Vocabulary
+    from services.vocabulary import bulk_import_vocabulary
+
+    results = []
+    with app.app_context():
+        for n in sizes:
+            # Half of the payload is already saved, like re-importing a grown list
+            items = generate_items(n)
+            row = {'size': n}
+            for name, fn in (('legacy', legacy_import), ('bulk', bulk_import_vocabulary)):
+                Vocabulary.query.delete()
+                db.session.commit()
+                fn(items[:n // 2])
+                seconds, (saved, skipped) = timed(fn, items)
+                row[name] = round(seconds, 4)
+                row[f'{name}_saved'] = len(saved)
+                row[f'{name}_skipped'] = len(skipped)
+            row['speedup'] = round(row['legacy'] / row['bulk'], 1) if row['bulk'] else None
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='100,1000,5000')
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    app = bench_app(args.database_url)
+    sizes = [int(s) for s in args.sizes.split(',')]
+    print(f"{'items':>8} {'legacy s':>10} {'bulk s':>10} {'speedup':>8}")
+    for row in run(app, sizes):
+        assert row['legacy_saved'] == row['bulk_saved'] and row['legacy_skipped'] == row['bulk_skipped']
+        print(f"{row['size']:>8} {row['legacy']:>10} {row['bulk']:>10} {row['speedup']:>7}x")
+
+
+if __name__ == '__main__':
+    main()
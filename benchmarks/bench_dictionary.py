@@ -0,0 +1,72 @@
+"""
+Offline dictionary: import time for a large dump and per-lookup latency
+(SQLite point reads vs LRU hits vs batched lookups).
+
+    python -m benchmarks.bench_dictionary --entries 300000 --lookups 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import timed
+
+
+def write_dump(path, n):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('word\ttranslation\tphonetic\n')
+        for i in range(n):
+            f.write(f'word{i}\tnghĩa của từ {i}\t/wɜːd{i}/\n')
+
+
+def per_lookup_us(fn, words):
+    start = time.perf_counter()
+    for word in words:
+        fn(word)
+    return (time.perf_counter() - start) / len(words) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=300000)
+    parser.add_argument('--lookups', type=int, default=100000)
+    parser.add_argument('--miss-ratio', type=float, default=0.2, help='share of looked-up words not in the dictionary')
+    args = parser.parse_args()
+
+    from services.dictionary import Dictionary, build_dictionary
+
+    workdir = tempfile.mkdtemp(prefix='bench-dict-')
+    dump = os.path.join(workdir, 'dump.tsv')
+    target = os.path.join(workdir, 'dictionary.db')
+    write_dump(dump, args.entries)
+
+    seconds, count = timed(build_dictionary, [dump], target)
+    print(f"import: {count} entries in {seconds:.2f}s "
+          f"({os.path.getsize(dump) // 1024} KB dump -> {os.path.getsize(target) // 1024} KB store)")
+
+    rng = random.Random(0)
+    words = [
+        f'missing{rng.randrange(args.entries)}' if rng.random() < args.miss_ratio else f'word{rng.randrange(args.entries)}'
+        for _ in range(args.lookups)
+    ]
+
+    # No LRU: every lookup is a primary-key read on the memory-mapped file
+    uncached = Dictionary(target, cache_size=0)
+    cached = Dictionary(target, cache_size=args.lookups)
+    cached_words = words[:1000]
+    for word in cached_words:
+        cached.lookup(word)
+
+    print(f"{'lookup path':>22} {'us/lookup':>10}")
+    print(f"{'sqlite (no LRU)':>22} {per_lookup_us(uncached.lookup, words):>10.2f}")
+    print(f"{'LRU hit':>22} {per_lookup_us(cached.lookup, cached_words * (len(words) // 1000)):>10.2f}")
+
+    batch = Dictionary(target, cache_size=0)
+    seconds, found = timed(batch.lookup_many, words)
+    print(f"{'lookup_many (batched)':>22} {seconds / len(words) * 1e6:>10.2f}")
+    print(f"hit ratio {len(set(found)) / len(set(words)):.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Cost of the metrics subsystem: request latency with METRICS_ENABLED off
+vs on for a few read endpoints, and the time to render a /metrics scrape.
+
+    python -m benchmarks.bench_metrics --requests 2000
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.common import bench_app
+
+URLS = ('/api/lessons', '/api/vocabulary?limit=50', '/api/vocabulary/practice')
+
+
+def timed_get(client, url):
+    start = time.perf_counter()
+    response = client.get(url)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.status_code
+    return elapsed
+
+
+def median_us(clients, url, n):
+    """Median latency per client, requests interleaved so drift affects both alike"""
+    times = {name: [] for name in clients}
+    for _ in range(n):
+        for name, client in clients.items():
+            times[name].append(timed_get(client, url))
+    return {name: statistics.median(values) * 1e6 for name, values in times.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--cards', type=int, default=1000)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    plain = bench_app(args.database_url)
+
+    from app import create_app
+    from config import Config
+    from benchmarks.bench_serialization import generate_items
+    from services.vocabulary import bulk_import_vocabulary
+
+    class MetricsConfig(Config):
+        METRICS_ENABLED = True
+
+    # Same database; only the instrumented app registers hooks and SQL listeners
+    instrumented = create_app(MetricsConfig)
+    with plain.app_context():
+        bulk_import_vocabulary(generate_items(args.cards))
+
+    clients = {'off': plain.test_client(), 'on': instrumented.test_client()}
+    print(f"{'endpoint':>28} {'off us':>9} {'on us':>9} {'overhead':>9}")
+    for url in URLS:
+        median_us(clients, url, 50)  # warm up
+        medians = median_us(clients, url, args.requests)
+        off, on = medians['off'], medians['on']
+        print(f"{url:>28} {off:>9.0f} {on:>9.0f} {(on - off) / off:>9.1%}")
+
+    render_ms = median_us({'on': clients['on']}, '/metrics', 20)['on'] / 1000
+    size = len(clients['on'].get('/metrics').get_data())
+    print(f"/metrics render: {render_ms:.1f} ms, {size // 1024} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Key normalization on lesson traffic: hit ratio of a cache keyed on
+lower-cased surface forms (the original key), on surface_term (the
+translation cache key: punctuation and case folded) and on the lemma
+(the dictionary and duplicate-detection key), plus the cost per key.
+
+Traffic is every word of every seeded lesson hovered once, in reading
+order; the ratio is for an initially empty cache.
+
+    python -m benchmarks.bench_normalization
+"""
+import argparse
+import re
+import time
+
+from benchmarks.common import bench_app
+
+# What the reading view sends: whitespace tokens with punctuation stripped, case kept
+_TOKEN_CLEAN_RE = re.compile(r"[^\w'-]", re.UNICODE)
+
+
+def lesson_tokens(lessons):
+    tokens = []
+    for lesson in lessons:
+        for token in lesson.content.split():
+            token = _TOKEN_CLEAN_RE.sub('', token)
+            if token and any(ch.isalpha() for ch in token):
+                tokens.append(token)
+    return tokens
+
+
+def surface_key(text):
+    """The previous translation cache key"""
+    return ' '.join(text.split()).lower()
+
+
+def hit_ratio(keys):
+    return 1 - len(set(keys)) / len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    app = bench_app(args.database_url)
+
+    from models import Lesson
+    from services.dictionary import store as dictionary
+    from services.normalization import lemmatizer, normalize_term, surface_term
+
+    with app.app_context():
+        tokens = lesson_tokens(Lesson.query.order_by(Lesson.id).all())
+
+    print(f"{len(tokens)} lookups from seeded lessons, dictionary "
+          f"{'available' if dictionary.available else 'not installed (irregular forms only)'}")
+    print(f"{'cache key':>10} {'unique keys':>12} {'hit ratio':>10} {'us/key':>8}")
+    for name, fn in (('surface', surface_key), ('term', surface_term), ('lemma', normalize_term)):
+        lemmatizer.memo.clear()
+        start = time.perf_counter()
+        keys = [fn(token) for token in tokens]
+        per_key = (time.perf_counter() - start) / len(tokens) * 1e6
+        print(f"{name:>10} {len(set(keys)):>12} {hit_ratio(keys):>10.3f} {per_key:>8.2f}")
+
+    merged = {}
+    for token in tokens:
+        merged.setdefault(normalize_term(token), set()).add(surface_key(token))
+    examples = sorted((sorted(forms) for forms in merged.values() if len(forms) > 2), key=len, reverse=True)
+    print('merged forms, e.g.:', '; '.join(', '.join(forms) for forms in examples[:8]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+/api/search latency: index build, warm queries (whole words, type-ahead
+prefixes, multi-word) and the first query after a card is reviewed or
+a word is saved.
+
+    python -m benchmarks.bench_search --cards 10000
+    python -m benchmarks.bench_search --database-url postgresql://...
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.bench_serialization import generate_items
+from benchmarks.common import bench_app
+
+QUERIES = ('word42', 'word9', 'w', 'nghĩa', 'sentence word123', 'câu', 'morning', 'zzz')
+
+
+def timed_get(client, url):
+    start = time.perf_counter()
+    response = client.get(url)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return elapsed, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    app = bench_app(args.database_url)
+
+    from services.vocabulary import bulk_import_vocabulary
+
+    with app.app_context():
+        bulk_import_vocabulary(generate_items(args.cards))
+
+    client = app.test_client()
+    seconds, _response = timed_get(client, '/api/search?q=word1')
+    print(f"{args.cards} cards; first query (builds the in-process index on SQLite): {seconds * 1000:.1f} ms")
+
+    print(f"{'query':>18} {'median ms':>10} {'results':>8}")
+    for query in QUERIES:
+        times = []
+        for _ in range(args.repeat):
+            # A fresh query string each time - ETags would otherwise answer with 304s
+            seconds, response = timed_get(client, f'/api/search?q={query}&_={len(times)}')
+            times.append(seconds)
+        print(f"{query:>18} {statistics.median(times) * 1000:>10.2f} {len(response.get_json()):>8}")
+
+    card = client.get('/api/search?q=word7&limit=1').get_json()[0]
+    client.put(f"/api/vocabulary/{card['id']}/review", json={'quality': 4})
+    seconds, _response = timed_get(client, '/api/search?q=word7&after=review')
+    print(f"first query after a review (index untouched): {seconds * 1000:.1f} ms")
+
+    client.post('/api/vocabulary', json={'word': 'freshly', 'translation': 'mới'})
+    seconds, _response = timed_get(client, '/api/search?q=word7&after=save')
+    print(f"first query after saving a word (re-checks the vocabulary rows): {seconds * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
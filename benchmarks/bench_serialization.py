@@ -0,0 +1,98 @@
+"""
+Vocabulary list serialization: ORM to_dict() + jsonify vs Core rows + fast encoder.
+
+    python -m benchmarks.bench_serialization --sizes 1000,10000,100000
+"""
+import argparse
+import json
+
+from benchmarks.common import bench_app, timed
+
+
+def generate_items(n):
+    return [
+        {
+            'word': f'word{i}',
+            'translation': f'Nghĩa {i}',
+            'phonetic': f'/wɜːd{i}/',
+            'example_en': f'This is word{i} in a sentence.',
+            'example_vi': f'Đây là từ {i} trong câu.',
+            'level': 'A1',
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_list():
+    """The previous get_vocabulary: ORM instances, to_dict() and jsonify"""
+    from flask import jsonify
+    from models import Vocabulary
+
+    vocab = Vocabulary.query.order_by(Vocabulary.created_at.desc(), Vocabulary.id.desc()).all()
+    return jsonify([v.to_dict() for v in vocab]).get_data()
+
+
+def fast_list():
+    """The current get_vocabulary path: Core tuples, one encoder pass, optional compression"""
+    from models import Vocabulary
+    from utils.pagination import fetch_page, page_response, parse_fields
+
+    items, next_cursor = fetch_page(
+        Vocabulary, parse_fields(Vocabulary), (Vocabulary.created_at, Vocabulary.id), descending=True
+    )
+    response = page_response(items, next_cursor)
+    return response.get_data(), response.headers.get('Content-Encoding')
+
+
+def run(app, sizes):
+    from extensions import db
+    from models import Vocabulary
+    from services.vocabulary import bulk_import_vocabulary
+
+    results = []
+    with app.app_context():
+        for n in sizes:
+            Vocabulary.query.delete()
+            db.session.commit()
+            bulk_import_vocabulary(generate_items(n))
+            db.session.expunge_all()
+
+            row = {'size': n}
+            with app.test_request_context('/api/vocabulary'):
+                row['legacy'], legacy_body = timed(legacy_list)
+                db.session.expunge_all()
+                row['fast'], (fast_body, _encoding) = timed(fast_list)
+            with app.test_request_context('/api/vocabulary', headers={'Accept-Encoding': 'br, gzip'}):
+                row['compressed'], (compressed_body, encoding) = timed(fast_list)
+
+            assert json.loads(legacy_body) == json.loads(fast_body)
+            row['legacy_bytes'] = len(legacy_body)
+            row['fast_bytes'] = len(fast_body)
+            row['compressed_bytes'] = len(compressed_body)
+            row['encoding'] = encoding
+            row['speedup'] = round(row['legacy'] / row['fast'], 1) if row['fast'] else None
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    from services import serialization
+    app = bench_app(args.database_url)
+    sizes = [int(s) for s in args.sizes.split(',')]
+    print(f"encoder: {'orjson' if serialization.orjson else 'json'}, "
+          f"compression: {'br' if serialization.brotli else 'gzip'}")
+    print(f"{'rows':>8} {'legacy s':>10} {'fast s':>10} {'speedup':>8} {'+compress s':>12} "
+          f"{'legacy KB':>10} {'fast KB':>10} {'compr. KB':>10}")
+    for row in run(app, sizes):
+        print(f"{row['size']:>8} {row['legacy']:>10.4f} {row['fast']:>10.4f} {row['speedup']:>7}x "
+              f"{row['compressed']:>12.4f} {row['legacy_bytes'] // 1024:>10} {row['fast_bytes'] // 1024:>10} "
+              f"{row['compressed_bytes'] // 1024:>10}")
+
+
+if __name__ == '__main__':
+    main()
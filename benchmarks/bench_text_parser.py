@@ -0,0 +1,101 @@
+"""
+Text parser micro-benchmarks: previous substring-scan association vs
+the indexed engine, on generated study sheets.
+
+    python -m benchmarks.bench_text_parser --sizes 500,2000,5000
+"""
+import argparse
+import random
+import re
+
+from benchmarks.common import timed
+from services.text_parser import iter_vocabulary_with_examples, parse_vocabulary_with_examples
+
+_WORDS = [
+    'account', 'balance', 'cache', 'deploy', 'engine', 'feature', 'gateway', 'handler',
+    'index', 'journal', 'kernel', 'latency', 'module', 'network', 'object', 'payload',
+    'query', 'request', 'session', 'thread', 'update', 'version', 'worker', 'yield',
+]
+
+
+def generate_sheet(n_vocab, n_examples, seed=42):
+    """A study sheet: n_vocab entries, then n_examples example sentences"""
+    rnd = random.Random(seed)
+    lines = ['1. Từ khóa:']
+    vocab_words = [f'{rnd.choice(_WORDS)}{i}' for i in range(n_vocab)]
+    for i, word in enumerate(vocab_words):
+        lines.append(f'{word.title()} /ˈwɜːd{i}/: Nghĩa số {i} (context {i}).')
+    lines.append('')
+    lines.append('2. Mẫu câu:')
+    for i in range(n_examples):
+        word = rnd.choice(vocab_words)
+        filler = ' '.join(rnd.choice(_WORDS) for _ in range(6))
+        lines.append(f'"The {word} uses {filler}." (Câu ví dụ {i}.)')
+    return '\n'.join(lines)
+
+
+def legacy_parse(text):
+    """The previous parse_vocabulary_with_examples: whole-text regex passes and O(V*E) association"""
+    results = []
+    vocab_pattern = re.compile(r'([A-Za-z][\w\s\-\']*?)\s*/([^/]+)/\s*[:\-–]\s*([^\n]+)', re.UNICODE | re.MULTILINE)
+    for match in vocab_pattern.finditer(text):
+        translation_raw = match.group(3).strip()
+        context_match = re.search(r'\(([^)]+)\)\s*\.?\s*$', translation_raw)
+        context = None
+        translation = translation_raw
+        if context_match:
+            context = context_match.group(1).strip()
+            translation = translation_raw[:context_match.start()].strip().rstrip('.,')
+        results.append({'word': match.group(1).strip(), 'phonetic': match.group(2).strip(),
+                        'translation': translation, 'context': context,
+                        'example_en': None, 'example_vi': None})
+    example_pattern = re.compile(r'["\"]([^"\""]+)["\"]\s*[\(\（]([^)\）]+)[\)\）]', re.UNICODE)
+    examples = [{'en': m.group(1).strip(), 'vi': m.group(2).strip()} for m in example_pattern.finditer(text)]
+    for vocab in results:
+        word_lower = vocab['word'].lower()
+        for ex in examples:
+            if word_lower in ex['en'].lower() and not vocab['example_en']:
+                vocab['example_en'] = ex['en']
+                vocab['example_vi'] = ex['vi']
+                break
+    used_examples = {(v['example_en'], v['example_vi']) for v in results if v['example_en']}
+    for ex in examples:
+        if (ex['en'], ex['vi']) not in used_examples:
+            results.append({'word': ex['en'], 'phonetic': None, 'translation': ex['vi'],
+                            'context': 'Example sentence', 'example_en': ex['en'], 'example_vi': ex['vi']})
+    return results
+
+
+def _first_item(text):
+    return next(iter(iter_vocabulary_with_examples(text.splitlines())))
+
+
+def run(sizes, repeat=3):
+    results = []
+    for n in sizes:
+        text = generate_sheet(n, n)
+        row = {'vocab': n, 'examples': n, 'bytes': len(text.encode('utf-8'))}
+        for name, fn in (('legacy', legacy_parse),
+                         ('indexed', parse_vocabulary_with_examples),
+                         ('stream_first_item', _first_item)):
+            row[name] = round(min(timed(fn, text)[0] for _ in range(repeat)), 4)
+        row['speedup'] = round(row['legacy'] / row['indexed'], 1) if row['indexed'] else None
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='500,2000,5000')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    print(f"{'V=E':>6} {'KB':>7} {'legacy s':>10} {'indexed s':>10} {'first item s':>13} {'speedup':>8}")
+    for row in run(sizes, args.repeat):
+        print(f"{row['vocab']:>6} {row['bytes'] // 1024:>7} {row['legacy']:>10} {row['indexed']:>10} "
+              f"{row['stream_first_item']:>13} {row['speedup']:>7}x")
+
+
+if __name__ == '__main__':
+    main()
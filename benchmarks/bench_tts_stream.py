@@ -0,0 +1,79 @@
+"""
+Time to first audio byte for a whole lesson: POST /api/tts (one synthesis of
+the full text) vs GET /api/tts/stream (sentence chunks rendered in parallel).
+
+Runs against the stub TTS upstream, which answers each request after
+``--delay`` seconds. Each mode starts from an empty audio cache; a final
+stream run shows replay from the per-sentence cache.
+
+    python -m benchmarks.bench_tts_stream --delay 0.5 --lesson-id 5
+"""
+import argparse
+import os
+import shutil
+import time
+
+from benchmarks.common import bench_app
+from benchmarks.stubs import StubUpstream
+
+
+def measure(client, method, url, **kwargs):
+    """Return (seconds to first body chunk, total seconds, bytes) for one request"""
+    start = time.perf_counter()
+    response = client.open(url, method=method, **kwargs)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    first = None
+    size = 0
+    for data in response.response:
+        if data and first is None:
+            first = time.perf_counter() - start
+        size += len(data)
+    response.close()
+    return first, time.perf_counter() - start, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--delay', type=float, default=0.5, help='stub upstream latency per request')
+    parser.add_argument('--lesson-id', type=int, default=None, help='defaults to the longest seeded lesson')
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    stub = StubUpstream(delay=args.delay).start()
+    os.environ['TTS_UPSTREAM_URL'] = stub.tts_url
+    os.environ.setdefault('TTS_DEADLINE', '120')
+    app = bench_app(args.database_url)
+
+    from models import Lesson
+    from services import tts
+
+    with app.app_context():
+        if args.lesson_id:
+            lesson = Lesson.query.get_or_404(args.lesson_id)
+        else:
+            lesson = max(Lesson.query.all(), key=lambda l: len(l.content))
+        text = lesson.content
+        chunks = tts.split_sentences(text)
+
+    print(f"lesson {lesson.id} ({lesson.level}): {len(text)} chars, {len(chunks)} chunks, "
+          f"upstream delay {args.delay}s, stream concurrency {app.config['TTS_STREAM_CONCURRENCY']}")
+    print(f"{'mode':>14} {'first byte s':>13} {'total s':>9} {'KB':>6} {'upstream calls':>15}")
+
+    client = app.test_client()
+    runs = [
+        ('full', 'POST', '/api/tts', {'json': {'text': text}}, True),
+        ('stream', 'GET', f'/api/tts/stream?lesson_id={lesson.id}', {}, True),
+        ('stream cached', 'GET', f'/api/tts/stream?lesson_id={lesson.id}', {}, False),
+    ]
+    for name, method, url, kwargs, cold in runs:
+        if cold:
+            shutil.rmtree(tts._cache['dir'], ignore_errors=True)
+            os.makedirs(tts._cache['dir'], exist_ok=True)
+        calls = stub.calls
+        first, total, size = measure(client, method, url, **kwargs)
+        print(f"{name:>14} {first:>13.3f} {total:>9.3f} {size // 1024:>6} {stub.calls - calls:>15}")
+    stub.stop()
+
+
+if __name__ == '__main__':
+    main()
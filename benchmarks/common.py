@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+import time
+
+# Benchmarks run from the repository root: python -m benchmarks.<name>
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def bench_app(database_url=None):
+    """
+    Create the Flask app against a throwaway database.
+
+    Must be called before anything imports config, since Config reads
+    the environment at import time. Defaults to a fresh SQLite file;
+    pass a PostgreSQL URL to benchmark against a local server.
+    """
+    if database_url is None:
+        fd, path = tempfile.mkstemp(prefix='bench-', suffix='.db')
+        os.close(fd)
+        database_url = f'sqlite:///{path}'
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('GLOSSARY_BUILD_ON_SEED', '0')
+    os.environ.setdefault('TTS_PRERENDER_ENABLED', '0')
+    os.environ.setdefault('TTS_CACHE_DIR', tempfile.mkdtemp(prefix='bench-tts-'))
+
+    from app import create_app
+    from extensions import db
+    from utils.seed import init_db
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+    init_db(app)
+    return app
+
+
+def timed(fn, *args, **kwargs):
+    """Run fn once and return (seconds, result)"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
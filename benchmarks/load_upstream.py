@@ -0,0 +1,155 @@
+"""
+Load test: cheap endpoint latency while the translation upstream is slow.
+
+Starts a deliberately slow stub upstream, runs the app under gunicorn
+with sync workers and then with the threaded setup from gunicorn.conf.py,
+and measures GET /api/vocabulary while many clients POST /api/translate
+with uncached words.
+
+    python -m benchmarks.load_upstream --delay 2 --slow-clients 24 --duration 10
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import requests
+
+from benchmarks.common import ROOT
+from benchmarks.stubs import StubUpstream
+
+MODES = {
+    # The previous setup: one request per process, so every slow translate pins
+    # a whole worker (gunicorn switches to gthread if threads > 1)
+    'sync': (['--worker-class', 'sync', '--threads', '1'], {'UPSTREAM_OFFLOAD': '0'}),
+    # gunicorn.conf.py: threaded workers + bounded upstream pool
+    'gthread': ([], {'UPSTREAM_OFFLOAD': '1'}),
+}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def start_server(mode, workers, env):
+    port = _free_port()
+    args, mode_env = MODES[mode]
+    cmd = [sys.executable, '-m', 'gunicorn', 'app:app', '-c', 'gunicorn.conf.py',
+           '--bind', f'127.0.0.1:{port}', '--workers', str(workers), *args]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=dict(env, **mode_env),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(base + '/api/lessons?summary=1', timeout=1)
+            return proc, base
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f'gunicorn ({mode}) did not start')
+
+
+def run_load(base, slow_clients, duration):
+    stop = time.time() + duration
+    statuses = {}
+    latencies = []
+    lock = threading.Lock()
+
+    def slow_client():
+        session = requests.Session()
+        while time.time() < stop:
+            try:
+                r = session.post(base + '/api/translate', json={'text': uuid.uuid4().hex[:12]}, timeout=60)
+                status = r.status_code
+            except requests.RequestException:
+                status = 'error'
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+
+    def probe():
+        session = requests.Session()
+        while time.time() < stop:
+            start = time.perf_counter()
+            try:
+                session.get(base + '/api/vocabulary?limit=20', timeout=60)
+            except requests.RequestException:
+                pass
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=slow_client) for _ in range(slow_clients)]
+    threads.append(threading.Thread(target=probe))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return {
+        'probe_requests': len(latencies),
+        'probe_p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+        'probe_p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+        'probe_max_ms': round(max(latencies) * 1000, 1),
+        'translate_statuses': statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--delay', type=float, default=2.0, help='stub upstream latency in seconds')
+    parser.add_argument('--slow-clients', type=int, default=24)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--modes', default='sync,gthread')
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    stub = StubUpstream(delay=args.delay).start()
+    database_url = args.database_url
+    if database_url is None:
+        fd, path = tempfile.mkstemp(prefix='load-', suffix='.db')
+        os.close(fd)
+        database_url = f'sqlite:///{path}'
+
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        GLOSSARY_BUILD_ON_SEED='0',
+        TTS_PRERENDER_ENABLED='0',
+        TRANSLATION_API_URL=stub.translate_url,
+        TTS_UPSTREAM_URL=stub.tts_url,
+        TRANSLATION_TIMEOUT=str(args.delay * 2),
+        TRANSLATION_DEADLINE=str(args.delay * 3),
+    )
+
+    print(f"upstream delay {args.delay}s, {args.slow_clients} slow clients, "
+          f"{args.workers} workers, {args.duration}s per mode")
+    for mode in args.modes.split(','):
+        proc, base = start_server(mode, args.workers, env)
+        try:
+            result = run_load(base, args.slow_clients, args.duration)
+        finally:
+            proc.terminate()
+            proc.wait()
+        print(f"{mode:>8}: GET /api/vocabulary p50 {result['probe_p50_ms']} ms, "
+              f"p95 {result['probe_p95_ms']} ms, max {result['probe_max_ms']} ms "
+              f"({result['probe_requests']} probes); translate statuses {result['translate_statuses']}")
+    stub.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Local stand-ins for the Google translate and TTS endpoints.
+
+Point the app at them with TRANSLATION_API_URL and TTS_UPSTREAM_URL:
+
+    stub = StubUpstream(delay=1.0).start()
+    os.environ['TRANSLATION_API_URL'] = stub.translate_url
+    os.environ['TTS_UPSTREAM_URL'] = stub.tts_url
+"""
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+# A few bytes standing in for an MP3 frame
+FAKE_AUDIO = b'ID3\x03\x00\x00\x00\x00\x00\x00' + b'\xff\xfb\x90\x00' * 64
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        stub._record()
+        time.sleep(stub.delay)
+
+        if self.path.startswith('/translate'):
+            text = form.get('q', [''])[0]
+            # Same shape as translate_a/single: [[[translation, original], ...], ...]
+            body = json.dumps([[[f'{text} (vi)', text]]], ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        else:
+            # gTTS looks for the base64 audio after the jQ1olc rpc id
+            audio = base64.b64encode(FAKE_AUDIO).decode('ascii')
+            body = (')]}\'\n\n[["wrb.fr","jQ1olc","[\\"%s\\"]",null,null,null,"generic"]]\n' % audio).encode('ascii')
+            content_type = 'application/json; charset=utf-8'
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubUpstream:
+    """Threaded HTTP server answering translate and TTS requests after ``delay`` seconds"""
+
+    def __init__(self, delay=0.0, host='127.0.0.1', port=0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+
+    def _record(self):
+        with self._lock:
+            self.calls += 1
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def translate_url(self):
+        return self.base_url + '/translate'
+
+    @property
+    def tts_url(self):
+        return self.base_url + '/tts'
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,39 @@
+"""
+Gunicorn settings - picked up automatically by ``gunicorn app:app``.
+
+Threaded workers let database-only requests keep flowing while other
+threads wait on Google; services/offload.py bounds how many threads
+upstream calls may hold (UPSTREAM_POOL_SIZE + UPSTREAM_QUEUE_SIZE), so
+keep GUNICORN_THREADS comfortably above that.
+
+Every worker has its own database connection pool (config.py:
+DB_POOL_SIZE, which defaults to GUNICORN_THREADS, plus DB_MAX_OVERFLOW).
+Keep
+
+    workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) <= max_connections
+
+on PostgreSQL, leaving room for other clients. Unless GUNICORN_WORKERS
+is set, the worker count is capped so that it holds for
+DB_MAX_CONNECTIONS (PostgreSQL's default of 100) minus DB_RESERVED_CONNECTIONS.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+# Same defaults as config.py
+_connections_per_worker = (int(os.environ.get('DB_POOL_SIZE', threads))
+                           + int(os.environ.get('DB_MAX_OVERFLOW', 4)))
+_connection_budget = (int(os.environ.get('DB_MAX_CONNECTIONS', 100))
+                      - int(os.environ.get('DB_RESERVED_CONNECTIONS', 10)))
+workers = int(os.environ.get(
+    'GUNICORN_WORKERS',
+    max(1, min(multiprocessing.cpu_count() * 2 + 1, _connection_budget // _connections_per_worker))
+))
+
+# Longer than the slowest upstream deadline (TTS_DEADLINE)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30  # Lets the write-behind buffer flush on shutdown
+keepalive = 5
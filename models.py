@@ -1,7 +1,30 @@
 from datetime import datetime
+from sqlalchemy import literal_column, text
 from extensions import db
 
 
+def search_document(*weighted_columns):
+    """
+    PostgreSQL full-text document: setweight(to_tsvector('simple', col), weight) || ...
+    The 'simple' configuration keeps Vietnamese text and English words unstemmed.
+    """
+    document = None
+    for column, weight in weighted_columns:
+        vector = db.func.setweight(
+            db.func.to_tsvector(literal_column("'simple'"), db.func.coalesce(column, literal_column("''"))),
+            literal_column(f"'{weight}'")
+        )
+        document = vector if document is None else document.op('||')(vector)
+    return document
+
+
+def postgresql_only(index):
+    """Create an index (GIN full-text/trigram) only on PostgreSQL"""
+    index.info['dialect'] = 'postgresql'
+    return index.ddl_if(dialect='postgresql')
+
+
+
 class Lesson(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -10,6 +33,15 @@ class Lesson(db.Model):
     category = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_lesson_created_at_id', 'created_at', 'id'),
+        db.Index('ix_lesson_level_created_at_id', 'level', 'created_at', 'id'),
+        # /api/search
+        postgresql_only(db.Index(
+            'ix_lesson_search', search_document((title, 'A'), (content, 'C')), postgresql_using='gin'
+        )),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -24,6 +56,7 @@ class Lesson(db.Model):
 class Vocabulary(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     word = db.Column(db.String(100), nullable=False)
+    lemma = db.Column(db.String(100), nullable=True)  # normalize_term(word) - catches inflected duplicates
     translation = db.Column(db.String(200), nullable=False)
     phonetic = db.Column(db.String(100), nullable=True)  # IPA phonetic transcription
     context = db.Column(db.Text, nullable=True)
@@ -35,11 +68,33 @@ class Vocabulary(db.Model):
     speech_correct = db.Column(db.Integer, default=0)  # Speech practice correct count
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_reviewed = db.Column(db.DateTime, nullable=True)
+    # Spaced repetition (SM-2) state - see services/srs.py
+    ease = db.Column(db.Float, default=2.5)
+    interval_days = db.Column(db.Integer, default=0)
+    repetitions = db.Column(db.Integer, default=0)  # Consecutive successful reviews
+    next_due = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Words are unique case-insensitively; duplicate checks filter on lower(word)
+        db.Index('ix_vocabulary_word_lower', db.func.lower(word), unique=True),
+        db.Index('ix_vocabulary_lemma', 'lemma'),
+        db.Index('ix_vocabulary_level', 'level'),
+        db.Index('ix_vocabulary_next_due_id', 'next_due', 'id'),  # Practice due queue
+        db.Index('ix_vocabulary_created_at_id', 'created_at', 'id'),
+        # /api/search - full-text document plus trigrams of the word for typo-tolerant matches
+        postgresql_only(db.Index(
+            'ix_vocabulary_search',
+            search_document((word, 'A'), (translation, 'B'), (example_en, 'C'), (example_vi, 'C')),
+            postgresql_using='gin'
+        )),
+        postgresql_only(db.Index('ix_vocabulary_word_trgm', text('lower(word) gin_trgm_ops'), postgresql_using='gin')),
+    )
 
     def to_dict(self):
         return {
             'id': self.id,
             'word': self.word,
+            'lemma': self.lemma,
             'translation': self.translation,
             'phonetic': self.phonetic,
             'context': self.context,
@@ -50,5 +105,74 @@ class Vocabulary(db.Model):
             'typing_correct': self.typing_correct,
             'speech_correct': self.speech_correct,
             'created_at': self.created_at.isoformat(),
-            'last_reviewed': self.last_reviewed.isoformat() if self.last_reviewed else None
+            'last_reviewed': self.last_reviewed.isoformat() if self.last_reviewed else None,
+            'ease': self.ease,
+            'interval_days': self.interval_days,
+            'repetitions': self.repetitions,
+            'next_due': self.next_due.isoformat() if self.next_due else None
+        }
+
+
+class TranslationCache(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(10), nullable=False)
+    target = db.Column(db.String(10), nullable=False)
+    text_hash = db.Column(db.String(64), nullable=False)  # sha256 of normalized text
+    text = db.Column(db.Text, nullable=False)  # Normalized source text
+    translation = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('source', 'target', 'text_hash', name='uq_translation_cache_key'),
+    )
+
+
+class LessonGlossary(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lesson.id', ondelete='CASCADE'), nullable=False, unique=True)
+    entries = db.Column(db.JSON, nullable=False)  # {word form: translation}
+    missing = db.Column(db.JSON, nullable=True)  # Word forms the translator failed on; filled in on read
+    attempted_at = db.Column(db.DateTime, nullable=True)  # Last translation attempt - spaces out retries
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'lesson_id': self.lesson_id,
+            'count': len(self.entries),
+            'complete': not self.missing,
+            'entries': self.entries,
+            'created_at': self.created_at.isoformat()
         }
+
+
+class InflightCall(db.Model):
+    """Lease held by the worker currently performing an upstream call for a key"""
+    key = db.Column(db.String(64), primary_key=True)  # sha256 of the single-flight key
+    owner = db.Column(db.String(64), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class TableVersion(db.Model):
+    """Change counter per table, bumped by every write path; drives API ETags"""
+    name = db.Column(db.String(50), primary_key=True)  # Table name
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class TtsJob(db.Model):
+    """Background audio pre-rendering job, one per distinct TTS cache key"""
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(64), nullable=False, unique=True)  # services.tts.audio_cache_key
+    text = db.Column(db.Text, nullable=False)
+    lang = db.Column(db.String(10), nullable=False, default='en')
+    slow = db.Column(db.Boolean, nullable=False, default=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')  # pending, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Next try, or lease expiry while running
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_tts_job_status_run_after', 'status', 'run_after'),
+    )
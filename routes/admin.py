@@ -0,0 +1,61 @@
+from flask import Blueprint, Response, request, jsonify, send_file
+from functools import wraps
+import io
+import pstats
+
+from services.profiling import profiler
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+PROFILE_SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+def require_token(view):
+    """Hide admin endpoints unless profiling is on, and require the admin token"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled or not profiler.token:
+            return jsonify({'error': 'Not found'}), 404
+        auth = request.headers.get('Authorization', '')
+        token = auth[len('Bearer '):] if auth.startswith('Bearer ') else request.headers.get('X-Admin-Token')
+        if not profiler.check_token(token):
+            return jsonify({'error': 'Invalid or missing admin token'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+# ==================== ADMIN - PROFILES ====================
+
+@admin_bp.route('/profiles')
+@require_token
+def list_profiles():
+    """List stored request profiles, newest first"""
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    return jsonify(profiler.list_profiles(max(limit, 0)))
+
+
+@admin_bp.route('/profiles/<profile_id>')
+@require_token
+def get_profile(profile_id):
+    """Download a profile (?format=text for a pstats summary of a cProfile profile)"""
+    metadata = profiler.get_profile(profile_id)
+    if metadata is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    path = profiler.profile_path(metadata)
+
+    if request.args.get('format') == 'text':
+        if metadata['mode'] != 'cprofile':
+            return jsonify({'error': 'Text summaries are only available for cProfile profiles'}), 400
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in PROFILE_SORT_KEYS:
+            return jsonify({'error': f'sort must be one of {", ".join(PROFILE_SORT_KEYS)}'}), 400
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats(sort).print_stats(50)
+        header = ' '.join(f"{key}={metadata[key]}" for key in ('method', 'path', 'status', 'duration_ms', 'db_queries', 'db_ms'))
+        return Response(header + '\n' + out.getvalue(), mimetype='text/plain')
+
+    mimetype = 'application/octet-stream' if metadata['mode'] == 'cprofile' else 'text/plain'
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=metadata['file'])
@@ -1,33 +1,70 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, send_file, current_app, stream_with_context
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+import io
+import json
+import shutil
+import tempfile
 from models import Lesson, Vocabulary
 from extensions import db
-from services.translation import translate_text
-from services.tts import generate_speech_audio
-from services.text_parser import parse_vocabulary_with_examples
+from services.dictionary import store as dictionary
+from services.normalization import normalize_term
+from services.translation import translate_text, translate_batch, get_cache_stats
+from services.translation_client import TranslationUnavailable
+from services.tts import get_speech_audio_path, iter_speech_chunks
+from services.offload import UpstreamUnavailable
+from services.tts_queue import queue as tts_queue
+from services.text_parser import iter_vocabulary_with_examples
+from services.glossary import get_lesson_glossary
+from services.vocabulary import bulk_import_vocabulary, find_vocabulary_by_word
+from services.practice import apply_practice_results, existing_ids, parse_results
+from services.write_behind import review_buffer
+from services.versioning import VOCABULARY_TEXT, bump_version
+from services.search import KINDS as SEARCH_KINDS, search as search_content
+from services.serialization import json_response
+from utils.pagination import parse_fields, fetch_page, page_response, parse_limit, decode_offset, encode_cursor
+from utils.conditional import conditional_get
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 # ==================== API - LESSONS ====================
 
 @api_bp.route('/lessons')
+@conditional_get(Lesson.__tablename__)
 def get_lessons():
-    """Get all lessons, optionally filtered by level"""
+    """Get lessons, optionally filtered by level (?summary=1 omits content)"""
     level = request.args.get('level')
-    if level:
-        lessons = Lesson.query.filter_by(level=level.upper()).all()
-    else:
-        lessons = Lesson.query.all()
-    return jsonify([lesson.to_dict() for lesson in lessons])
+    filters = [Lesson.level == level.upper()] if level else []
+    summary_fields = [c.name for c in Lesson.__table__.columns if c.name != 'content']
+    
+    try:
+        fields = parse_fields(Lesson, default=summary_fields if request.args.get('summary') == '1' else None)
+        items, next_cursor = fetch_page(Lesson, fields, (Lesson.created_at, Lesson.id), filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return page_response(items, next_cursor)
 
 
 @api_bp.route('/lessons/<int:lesson_id>')
+@conditional_get(Lesson.__tablename__)
 def get_lesson(lesson_id):
     """Get a specific lesson by ID"""
     lesson = Lesson.query.get_or_404(lesson_id)
     return jsonify(lesson.to_dict())
 
 
+@api_bp.route('/lessons/<int:lesson_id>/glossary')
+def get_glossary(lesson_id):
+    """Get the precomputed word -> translation map of a lesson"""
+    lesson = Lesson.query.get_or_404(lesson_id)
+    
+    try:
+        glossary = get_lesson_glossary(lesson)
+        return jsonify(glossary.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # ==================== API - TRANSLATION ====================
 
 @api_bp.route('/translate', methods=['POST'])
@@ -43,43 +80,148 @@ def translate_word():
         translation = translate_text(text, source='en', target='vi')
         return jsonify({
             'original': text,
-            'translation': translation
+            'translation': translation,
+            'phonetic': dictionary.lookup_phonetic(text)
+        })
+    except TranslationUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/translate/batch', methods=['POST'])
+def translate_words_batch():
+    """Translate a list of English texts to Vietnamese in as few upstream calls as possible"""
+    data = request.get_json()
+    texts = data.get('texts', [])
+    
+    if not texts or not isinstance(texts, list):
+        return jsonify({'error': 'No texts provided'}), 400
+    
+    max_items = current_app.config.get('TRANSLATION_BATCH_MAX_ITEMS', 1000)
+    if len(texts) > max_items:
+        return jsonify({'error': f'At most {max_items} texts per request'}), 400
+    
+    try:
+        items = translate_batch(texts, source='en', target='vi')
+        return jsonify({
+            'count': len(items),
+            'items': items
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/translate/cache/stats')
+def translation_cache_stats():
+    """Get translation cache hit/miss counters"""
+    return jsonify(get_cache_stats())
+
+
 # ==================== API - TEXT-TO-SPEECH ====================
 
-@api_bp.route('/tts', methods=['POST'])
+@api_bp.route('/tts', methods=['GET', 'POST'])
 def text_to_speech():
-    """Convert text to speech and return audio file"""
-    data = request.get_json()
+    """Convert text to speech and return audio file (GET is cacheable and supports Range)"""
+    data = request.get_json(silent=True) or request.args
+    if not isinstance(data, dict) or not isinstance(data.get('text', ''), str):
+        return jsonify({'error': 'text must be a string'}), 400
     text = data.get('text', '').strip()
+    lang = data.get('lang', 'en')
+    slow = str(data.get('slow', '')).lower() in ('1', 'true')
     
     if not text:
         return jsonify({'error': 'No text provided'}), 400
     
     try:
-        audio_buffer = generate_speech_audio(text)
+        audio_path, audio_key = get_speech_audio_path(text, lang=lang, slow=slow)
         
-        return send_file(
-            audio_buffer,
+        response = send_file(
+            audio_path,
             mimetype='audio/mpeg',
             as_attachment=False,
-            download_name='speech.mp3'
+            download_name='speech.mp3',
+            conditional=True,
+            etag=audio_key,
+            max_age=current_app.config.get('TTS_CACHE_MAX_AGE', 0)
         )
+        # Content-addressed - the audio for a given URL never changes
+        response.cache_control.immutable = True
+        return response
+    except UpstreamUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/tts/stream', methods=['GET', 'POST'])
+def text_to_speech_stream():
+    """Stream speech for long text (or ?lesson_id=) sentence by sentence as chunks are synthesized"""
+    data = request.get_json(silent=True) or request.args
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    lang = data.get('lang', 'en')
+    slow = str(data.get('slow', '')).lower() in ('1', 'true')
+    lesson_id = data.get('lesson_id')
+    if lesson_id:
+        try:
+            text = Lesson.query.get_or_404(int(lesson_id)).content
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid lesson_id'}), 400
+    else:
+        text = data.get('text', '')
+        if not isinstance(text, str):
+            return jsonify({'error': 'text must be a string'}), 400
+        text = text.strip()
+        # Every sentence is a cached upstream render - bound what one request can start
+        max_chars = current_app.config['TTS_STREAM_MAX_CHARS']
+        if len(text) > max_chars:
+            return jsonify({'error': f'Text exceeds {max_chars} characters'}), 413
+    
+    chunks = iter_speech_chunks(text, lang=lang, slow=slow)
+    try:
+        # Wait for the first chunk here so failures still get a proper status code
+        first = next(chunks)
+    except StopIteration:
+        return jsonify({'error': 'No text provided'}), 400
+    except UpstreamUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        yield first
+        try:
+            yield from chunks
+        except Exception:
+            # Headers are gone - end the audio early rather than break the response
+            current_app.logger.exception('TTS stream aborted')
+    
+    response = Response(stream_with_context(generate()), mimetype='audio/mpeg')
+    response.headers['X-Accel-Buffering'] = 'no'  # let nginx pass chunks through as they arrive
+    return response
+
+
+@api_bp.route('/tts/queue')
+def tts_queue_status():
+    """Get audio pre-rendering queue depth and status"""
+    return jsonify(tts_queue.stats())
+
+
 # ==================== API - VOCABULARY ====================
 
 @api_bp.route('/vocabulary')
+@conditional_get(Vocabulary.__tablename__, extra=review_buffer.etag_key)
 def get_vocabulary():
-    """Get all saved vocabulary"""
-    vocabulary = Vocabulary.query.order_by(Vocabulary.created_at.desc()).all()
-    return jsonify([v.to_dict() for v in vocabulary])
+    """Get saved vocabulary, newest first (supports ?limit=, ?cursor= and ?fields=)"""
+    try:
+        fields = parse_fields(Vocabulary)
+        items, next_cursor = fetch_page(
+            Vocabulary, fields, (Vocabulary.created_at, Vocabulary.id), descending=True
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return page_response(_with_pending_results(items), next_cursor)
 
 
 @api_bp.route('/vocabulary', methods=['POST'])
@@ -89,6 +231,8 @@ def save_vocabulary():
     word = data.get('word', '').strip()
     translation = data.get('translation', '').strip()
     phonetic = data.get('phonetic', '').strip() if data.get('phonetic') else None
+    if not phonetic and word:
+        phonetic = dictionary.lookup_phonetic(word)
     context = data.get('context', '').strip() if data.get('context') else None
     example_en = data.get('example_en', '').strip() if data.get('example_en') else None
     example_vi = data.get('example_vi', '').strip() if data.get('example_vi') else None
@@ -98,12 +242,13 @@ def save_vocabulary():
         return jsonify({'error': 'Word and translation are required'}), 400
     
     # Check if word already exists
-    existing = Vocabulary.query.filter_by(word=word.lower()).first()
+    existing = find_vocabulary_by_word(word)
     if existing:
         return jsonify({'error': 'Word already saved', 'vocabulary': existing.to_dict()}), 409
     
     vocab = Vocabulary(
         word=word.lower(),
+        lemma=normalize_term(word),
         translation=translation,
         phonetic=phonetic,
         context=context,
@@ -112,19 +257,24 @@ def save_vocabulary():
         level=level
     )
     db.session.add(vocab)
-    db.session.commit()
+    try:
+        bump_version(Vocabulary.__tablename__, VOCABULARY_TEXT)
+        tts_queue.enqueue([vocab.word, vocab.example_en])
+        db.session.commit()
+    except IntegrityError:
+        # Saved concurrently by another request
+        db.session.rollback()
+        existing = find_vocabulary_by_word(word)
+        return jsonify({'error': 'Word already saved', 'vocabulary': existing.to_dict() if existing else None}), 409
     
     return jsonify(vocab.to_dict()), 201
 
 
 @api_bp.route('/vocabulary/<int:vocab_id>/review', methods=['PUT'])
 def review_vocabulary(vocab_id):
-    """Increment review count for a vocabulary item"""
-    vocab = Vocabulary.query.get_or_404(vocab_id)
-    vocab.review_count += 1
-    vocab.last_reviewed = datetime.utcnow()
-    db.session.commit()
-    return jsonify(vocab.to_dict())
+    """Record a flashcard review (optional JSON quality 0-5) and reschedule the card"""
+    data = request.get_json(silent=True) or {}
+    return _record_result(vocab_id, {'type': 'review', 'quality': data.get('quality')})
 
 
 @api_bp.route('/vocabulary/<int:vocab_id>', methods=['DELETE'])
@@ -132,23 +282,73 @@ def delete_vocabulary(vocab_id):
     """Delete a vocabulary item"""
     vocab = Vocabulary.query.get_or_404(vocab_id)
     db.session.delete(vocab)
+    bump_version(Vocabulary.__tablename__, VOCABULARY_TEXT)
     db.session.commit()
     return jsonify({'message': 'Vocabulary deleted successfully'})
 
 
+# ==================== API - SEARCH ====================
+
+@api_bp.route('/search')
+@conditional_get(Lesson.__tablename__, Vocabulary.__tablename__)
+def search():
+    """Search saved vocabulary and lessons (?q=, ?type=vocabulary|lesson), ranked, with prefix matching"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    
+    kind = request.args.get('type')
+    if kind and kind not in SEARCH_KINDS:
+        return jsonify({'error': f"type must be one of: {', '.join(SEARCH_KINDS)}"}), 400
+    
+    try:
+        limit = parse_limit(current_app.config.get('SEARCH_PAGE_SIZE', 20))
+        offset = decode_offset(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    items, next_offset = search_content(query, (kind,) if kind else SEARCH_KINDS, limit, offset)
+    return page_response(items, encode_cursor([next_offset]) if next_offset is not None else None)
+
+
 # ==================== API - TEXT PARSER ====================
 
 @api_bp.route('/vocabulary/parse', methods=['POST'])
 def parse_text():
-    """Parse text to extract vocabulary entries"""
-    data = request.get_json()
-    text = data.get('text', '').strip()
+    """Parse text or an uploaded file to extract vocabulary entries (?stream=1 for NDJSON)"""
+    upload = request.files.get('file')
+    if upload:
+        # Multipart files are closed with the request context, before a
+        # streamed response is generated - keep our own spooled copy
+        spool = tempfile.TemporaryFile()
+        shutil.copyfileobj(upload.stream, spool)
+        spool.seek(0)
+        lines = io.TextIOWrapper(spool, encoding='utf-8', errors='replace')
+    elif request.mimetype == 'text/plain':
+        # Raw upload - read line by line straight off the request body
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8', errors='replace')
+    else:
+        data = request.get_json()
+        text = data.get('text', '').strip()
+        if not text:
+            return jsonify({'error': 'No text provided'}), 400
+        lines = text.splitlines()
     
-    if not text:
-        return jsonify({'error': 'No text provided'}), 400
+    stream = request.args.get('stream') == '1' or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
+    
+    if stream:
+        def generate():
+            try:
+                for item in iter_vocabulary_with_examples(lines):
+                    yield json.dumps(item, ensure_ascii=False) + '\n'
+            except Exception as e:
+                yield json.dumps({'error': str(e)}) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
     
     try:
-        vocabulary_items = parse_vocabulary_with_examples(text)
+        vocabulary_items = list(iter_vocabulary_with_examples(lines, ordered=True))
         return jsonify({
             'count': len(vocabulary_items),
             'items': vocabulary_items
@@ -166,35 +366,7 @@ def save_vocabulary_bulk():
     if not items:
         return jsonify({'error': 'No items provided'}), 400
     
-    saved = []
-    skipped = []
-    
-    for item in items:
-        word = item.get('word', '').strip()
-        translation = item.get('translation', '').strip()
-        
-        if not word or not translation:
-            continue
-        
-        # Check if word already exists
-        existing = Vocabulary.query.filter_by(word=word.lower()).first()
-        if existing:
-            skipped.append({'word': word, 'reason': 'Already exists'})
-            continue
-        
-        vocab = Vocabulary(
-            word=word.lower(),
-            translation=translation,
-            phonetic=item.get('phonetic'),
-            context=item.get('context'),
-            example_en=item.get('example_en'),
-            example_vi=item.get('example_vi'),
-            level=item.get('level')
-        )
-        db.session.add(vocab)
-        saved.append(word)
-    
-    db.session.commit()
+    saved, skipped = bulk_import_vocabulary(items)
     
     return jsonify({
         'saved_count': len(saved),
@@ -206,55 +378,99 @@ def save_vocabulary_bulk():
 
 # ==================== API - PRACTICE ====================
 
+def _with_pending_results(items):
+    """Show practice results still held by the write-behind buffer"""
+    if review_buffer.enabled:
+        for item in items:
+            review_buffer.overlay(item)
+    return items
+
+
+def _record_result(vocab_id, result):
+    """Apply a single practice result atomically and return the updated item"""
+    try:
+        results = parse_results([dict(result, id=vocab_id)])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if review_buffer.enabled:
+        vocab = Vocabulary.query.get_or_404(vocab_id)
+        review_buffer.add(results)
+        return json_response(review_buffer.overlay(vocab.to_dict()))
+    
+    if apply_practice_results(results):
+        return jsonify({'error': 'Vocabulary not found'}), 404
+    return jsonify(db.session.get(Vocabulary, vocab_id).to_dict())
+
+
 @api_bp.route('/vocabulary/<int:vocab_id>/typing', methods=['PUT'])
 def update_typing_result(vocab_id):
     """Update typing practice result for a vocabulary item"""
     data = request.get_json()
-    correct = data.get('correct', False)
-    
-    vocab = Vocabulary.query.get_or_404(vocab_id)
-    
-    if correct:
-        vocab.typing_correct += 1
-    
-    vocab.review_count += 1
-    vocab.last_reviewed = datetime.utcnow()
-    db.session.commit()
-    
-    return jsonify(vocab.to_dict())
+    return _record_result(vocab_id, {'type': 'typing', 'correct': data.get('correct', False)})
 
 
 @api_bp.route('/vocabulary/<int:vocab_id>/speech', methods=['PUT'])
 def update_speech_result(vocab_id):
     """Update speech practice result for a vocabulary item"""
     data = request.get_json()
-    correct = data.get('correct', False)
-    
-    vocab = Vocabulary.query.get_or_404(vocab_id)
+    return _record_result(vocab_id, {'type': 'speech', 'correct': data.get('correct', False)})
+
+
+@api_bp.route('/vocabulary/results/batch', methods=['POST'])
+def save_practice_results():
+    """Apply many practice results in one transaction"""
+    # force: results flushed with navigator.sendBeacon() arrive as text/plain
+    data = request.get_json(force=True, silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    items = data.get('results', [])
     
-    if correct:
-        vocab.speech_correct += 1
+    max_items = current_app.config.get('PRACTICE_BATCH_MAX_ITEMS', 1000)
+    if isinstance(items, list) and len(items) > max_items:
+        return jsonify({'error': f'At most {max_items} results per request'}), 400
     
-    vocab.review_count += 1
-    vocab.last_reviewed = datetime.utcnow()
-    db.session.commit()
+    try:
+        results = parse_results(items)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify(vocab.to_dict())
+    if review_buffer.enabled:
+        found = existing_ids(list({result.vocab_id for result in results}))
+        review_buffer.add([result for result in results if result.vocab_id in found])
+        missing = list(dict.fromkeys(result.vocab_id for result in results if result.vocab_id not in found))
+    else:
+        missing = apply_practice_results(results)
+    return jsonify({
+        'applied_count': sum(1 for result in results if result.vocab_id not in missing),
+        'missing': missing
+    })
 
 
 @api_bp.route('/vocabulary/practice')
 def get_practice_vocabulary():
-    """Get vocabulary for practice, prioritizing less reviewed items"""
+    """Get the next due cards for a practice session (?due=0 also includes upcoming cards)"""
     mode = request.args.get('mode', 'words')  # 'words' or 'phrases'
     
+    filters = []
+    due_only = request.args.get('due', '1') != '0'
+    if due_only:
+        filters.append(Vocabulary.next_due <= datetime.utcnow())
     if mode == 'phrases':
         # Only items with example sentences
-        vocabulary = Vocabulary.query.filter(
-            Vocabulary.example_en.isnot(None),
-            Vocabulary.example_en != ''
-        ).order_by(Vocabulary.review_count.asc()).all()
-    else:
-        # All vocabulary
-        vocabulary = Vocabulary.query.order_by(Vocabulary.review_count.asc()).all()
+        filters += [Vocabulary.example_en.isnot(None), Vocabulary.example_en != '']
     
-    return jsonify([v.to_dict() for v in vocabulary])
+    try:
+        fields = parse_fields(Vocabulary)
+        items, next_cursor = fetch_page(
+            Vocabulary, fields, (Vocabulary.next_due, Vocabulary.id), filters,
+            default_limit=current_app.config['PRACTICE_SESSION_SIZE']
+        )
+        items = _with_pending_results(items)
+        if due_only and review_buffer.enabled:
+            # Answered since the page was read but not written yet
+            now = datetime.utcnow()
+            items = [item for item in items if not item.get('next_due') or item['next_due'] <= now]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return page_response(items, next_cursor)
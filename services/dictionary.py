@@ -0,0 +1,404 @@
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from urllib.request import pathname2url
+
+import click
+from flask.cli import AppGroup
+
+from services.cache import LRUCache
+
+# The store holds English -> Vietnamese entries
+LANGUAGES = ('en', 'vi')
+
+# Words per IN (...) in lookup_many() - below SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+# How often (seconds) a process checks whether the store file was replaced
+RELOAD_CHECK_INTERVAL = 1.0
+
+# Vocabulary.phonetic is a String(100)
+MAX_PHONETIC_CHARS = 100
+
+# Column names accepted in TSV headers and JSON objects
+_FIELD_ALIASES = {
+    'word': 'word', 'en': 'word', 'english': 'word', 'headword': 'word',
+    'translation': 'translation', 'vi': 'translation', 'meaning': 'translation', 'vietnamese': 'translation',
+    'phonetic': 'phonetic', 'ipa': 'phonetic', 'pronunciation': 'phonetic',
+}
+
+DictionaryEntry = namedtuple('DictionaryEntry', 'word translation phonetic')
+
+# Cached negative lookups - most words in a text are looked up again soon
+_MISSING = object()
+
+
+def normalize_word(word):
+    """Dictionary key for a word or phrase"""
+    return ' '.join(word.split()).lower()
+
+
+def _clean_phonetic(value):
+    value = (value or '').strip().strip('/[]').strip()
+    return value[:MAX_PHONETIC_CHARS] or None
+
+
+def _clean_translation(value):
+    if isinstance(value, (list, tuple)):
+        value = '; '.join(str(v).strip() for v in value if v)
+    return (value or '').strip()
+
+
+def _file_ident(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _open_readonly(path, mmap_bytes):
+    # The file is only ever replaced, never written in place, so SQLite can skip locking
+    uri = 'file:' + pathname2url(os.path.abspath(path)) + '?mode=ro&immutable=1'
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute(f'PRAGMA mmap_size = {int(mmap_bytes)}')
+    return conn
+
+
+class Dictionary:
+    """
+    Read-only EN -> VI dictionary in its own SQLite file.
+
+    Entries live in a WITHOUT ROWID table clustered on the normalized
+    word, read through memory-mapped, lock-free connections (one per
+    thread). An LRU in front answers repeated lookups - hits and misses -
+    without touching SQLite. Imports build a new file and atomically
+    replace the old one; running processes notice and reopen.
+    """
+
+    def __init__(self, path=None, cache_size=50000, mmap_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        self.cache = LRUCache(maxsize=cache_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ident = None
+        self._generation = 0
+        self._next_check = 0.0
+        self._hits = 0
+        self._misses = 0
+
+    def configure(self, path, cache_size=None, mmap_bytes=None):
+        with self._lock:
+            self.path = path
+            if mmap_bytes is not None:
+                self.mmap_bytes = mmap_bytes
+            self._next_check = 0.0
+        self.cache.configure(maxsize=cache_size)
+        self.cache.clear()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + RELOAD_CHECK_INTERVAL
+            ident = _file_ident(self.path) if self.path else None
+            if ident != self._ident:
+                self._ident = ident
+                self._generation += 1
+                self.cache.clear()
+
+    def _connection(self):
+        self._refresh()
+        local = self._local
+        # Reopen after an import replaced the file, or in a forked worker
+        state = (self._generation, os.getpid())
+        if getattr(local, 'state', None) != state:
+            conn = getattr(local, 'conn', None)
+            if conn is not None and local.state[1] == os.getpid():
+                conn.close()
+            local.conn = _open_readonly(self.path, self.mmap_bytes) if self._ident else None
+            local.state = state
+        return local.conn
+
+    def _count(self, hits, misses):
+        with self._lock:
+            self._hits += hits
+            self._misses += misses
+
+    @property
+    def available(self):
+        """True once a dictionary file has been imported"""
+        return self._connection() is not None
+
+    @property
+    def generation(self):
+        """Changes whenever the dictionary file is replaced"""
+        self._refresh()
+        return self._generation
+
+    def _get(self, conn, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            row = conn.execute('SELECT translation, phonetic FROM entries WHERE word = ?', (key,)).fetchone()
+            entry = DictionaryEntry(key, *row) if row else _MISSING
+            self.cache.set(key, entry)
+        return entry
+
+    def lookup(self, word):
+        """Return the DictionaryEntry for a word or phrase, or None"""
+        conn = self._connection()
+        if conn is None:
+            return None
+        entry = self._get(conn, normalize_word(word))
+        if entry is _MISSING:
+            self._count(0, 1)
+            return None
+        self._count(1, 0)
+        return entry
+
+    def contains(self, word):
+        """True if the word is a headword; not counted in the hit statistics"""
+        conn = self._connection()
+        return conn is not None and self._get(conn, normalize_word(word)) is not _MISSING
+
+    def lookup_many(self, words):
+        """Return {word: DictionaryEntry} for the given words that are in the dictionary"""
+        conn = self._connection()
+        if conn is None:
+            return {}
+        keys = {}
+        for word in words:
+            keys.setdefault(normalize_word(word), []).append(word)
+
+        found = {}
+        misses = []
+        for key in keys:
+            entry = self.cache.get(key)
+            if entry is None:
+                misses.append(key)
+            elif entry is not _MISSING:
+                found[key] = entry
+        for i in range(0, len(misses), CHUNK_SIZE):
+            chunk = misses[i:i + CHUNK_SIZE]
+            rows = conn.execute(
+                f"SELECT word, translation, phonetic FROM entries WHERE word IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            fetched = {row[0]: DictionaryEntry(*row) for row in rows}
+            for key in chunk:
+                self.cache.set(key, fetched.get(key, _MISSING))
+            found.update(fetched)
+
+        self._count(len(found), len(keys) - len(found))
+        return {word: found[key] for key, originals in keys.items() if key in found for word in originals}
+
+    def lookup_phonetic(self, word):
+        entry = self.lookup(word)
+        return entry.phonetic if entry is not None else None
+
+    def metadata(self):
+        conn = self._connection()
+        if conn is None:
+            return {}
+        return dict(conn.execute('SELECT name, value FROM meta').fetchall())
+
+    def stats(self):
+        meta = self.metadata()
+        with self._lock:
+            hits, misses = self._hits, self._misses
+        total = hits + misses
+        return {
+            'path': self.path,
+            'available': bool(meta),
+            'entries': int(meta['entries']) if meta else 0,
+            'built_at': meta.get('built_at'),
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0.0,
+            'cache': self.cache.stats(),
+        }
+
+
+def _row_fields(record):
+    fields = {}
+    for name, value in record.items():
+        field = _FIELD_ALIASES.get(str(name).strip().lower())
+        if field and field not in fields:
+            fields[field] = value
+    return fields
+
+
+def _read_tsv(f):
+    reader = csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+    header = None
+    for row in reader:
+        if not row or row[0].startswith('#'):
+            continue
+        if header is None:
+            # Optional header row; otherwise columns are word, translation[, phonetic]
+            names = [_FIELD_ALIASES.get(c.strip().lower()) for c in row]
+            if 'word' in names and 'translation' in names:
+                header = names
+                continue
+            header = ['word', 'translation', 'phonetic']
+        yield {name: value for name, value in zip(header, row) if name}
+
+
+def _read_json(f):
+    data = json.load(f)
+    if isinstance(data, dict):
+        # {"word": "translation"} or {"word": {"translation": ..., "phonetic": ...}}
+        for word, value in data.items():
+            if isinstance(value, dict):
+                yield dict(_row_fields(value), word=word)
+            else:
+                yield {'word': word, 'translation': value}
+    else:
+        for record in data:
+            yield _row_fields(record)
+
+
+def _read_jsonl(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield _row_fields(json.loads(line))
+
+
+_READERS = {'tsv': _read_tsv, 'json': _read_json, 'jsonl': _read_jsonl}
+
+
+def read_entries(path, fmt=None):
+    """Yield {word, translation, phonetic} dicts from a TSV, JSON or JSON Lines dump"""
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt in ('txt', 'tab'):
+        fmt = 'tsv'
+    if fmt == 'ndjson':
+        fmt = 'jsonl'
+    if fmt not in _READERS:
+        raise ValueError(f'Unknown dictionary format: {fmt!r} (expected tsv, json or jsonl)')
+    with open(path, encoding='utf-8-sig', newline='' if fmt == 'tsv' else None) as f:
+        yield from _READERS[fmt](f)
+
+
+def build_dictionary(sources, target, fmt=None, progress=None):
+    """
+    Build the dictionary file at ``target`` from one or more dumps.
+
+    Repeated words are merged: their distinct translations are joined
+    with '; ' and the first phonetic wins. Rows are written in key order
+    into a fresh file that then atomically replaces ``target``. Returns
+    the number of entries.
+    """
+    entries = {}
+    for source in sources:
+        for record in read_entries(source, fmt):
+            word = normalize_word(str(record.get('word') or ''))
+            translation = _clean_translation(record.get('translation'))
+            if not word or not translation:
+                continue
+            entry = entries.get(word)
+            if entry is None:
+                entries[word] = [[translation], _clean_phonetic(record.get('phonetic'))]
+            else:
+                if translation not in entry[0]:
+                    entry[0].append(translation)
+                entry[1] = entry[1] or _clean_phonetic(record.get('phonetic'))
+        if progress:
+            progress(f'{source}: {len(entries)} entries so far')
+
+    directory = os.path.dirname(os.path.abspath(target))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute('PRAGMA journal_mode = OFF')
+            conn.execute('PRAGMA synchronous = OFF')
+            conn.execute(
+                'CREATE TABLE entries (word TEXT PRIMARY KEY, translation TEXT NOT NULL, phonetic TEXT) WITHOUT ROWID'
+            )
+            conn.execute('CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID')
+            conn.executemany(
+                'INSERT INTO entries (word, translation, phonetic) VALUES (?, ?, ?)',
+                ((word, '; '.join(translations), phonetic)
+                 for word, (translations, phonetic) in sorted(entries.items()))
+            )
+            conn.executemany('INSERT INTO meta (name, value) VALUES (?, ?)', [
+                ('entries', str(len(entries))),
+                ('built_at', datetime.utcnow().isoformat()),
+                ('sources', json.dumps([os.path.basename(s) for s in sources])),
+            ])
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, target)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(entries)
+
+
+store = Dictionary()
+
+
+def init_app(app):
+    """Configure the offline dictionary from app config and register its CLI"""
+    store.configure(
+        app.config.get('DICTIONARY_PATH') or os.path.join(app.instance_path, 'dictionary.db'),
+        cache_size=app.config.get('DICTIONARY_CACHE_SIZE', 50000),
+        mmap_bytes=app.config.get('DICTIONARY_MMAP_BYTES')
+    )
+    app.cli.add_command(dictionary_cli)
+
+
+dictionary_cli = AppGroup('dictionary', help='Manage the offline EN -> VI dictionary.')
+
+
+@dictionary_cli.command('import')
+@click.argument('sources', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(sorted(_READERS)), help='Defaults to the file extension.')
+def import_command(sources, fmt):
+    """Build the dictionary from TSV/JSON dumps, replacing the current one."""
+    start = time.perf_counter()
+    count = build_dictionary(sources, store.path, fmt=fmt, progress=print)
+    print(f'Imported {count} entries into {store.path} in {time.perf_counter() - start:.1f}s')
+
+    # Saved words' lemmas depend on the dictionary (e.g. running -> run once "run" is in it)
+    from extensions import db
+    from utils.schema import recompute_lemmas
+
+    store.configure(store.path)  # Pick up the new file now rather than after RELOAD_CHECK_INTERVAL
+    changed = recompute_lemmas()
+    db.session.commit()
+    print(f'Recomputed lemmas for {changed} saved words')
+
+
+@dictionary_cli.command('lookup')
+@click.argument('words', nargs=-1, required=True)
+def lookup_command(words):
+    """Look words up in the dictionary."""
+    for word in words:
+        entry = store.lookup(word)
+        if entry is None:
+            print(f'{word}: not found')
+        else:
+            print(f"{entry.word}{' /' + entry.phonetic + '/' if entry.phonetic else ''}: {entry.translation}")
+
+
+@dictionary_cli.command('stats')
+def stats_command():
+    """Show the dictionary file and entry count."""
+    print(json.dumps(store.stats(), indent=2, ensure_ascii=False))
@@ -0,0 +1,103 @@
+import re
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from extensions import db
+from models import Lesson, LessonGlossary
+from services.translation import translate_batch
+
+# Mirrors processContent() in templates/index.html: split on whitespace,
+# then drop everything except word characters, apostrophes and hyphens
+_TOKEN_SPLIT_RE = re.compile(r'\s+')
+_TOKEN_CLEAN_RE = re.compile(r"[^\w'-]", re.UNICODE)
+_HAS_LETTER_RE = re.compile(r'[^\W\d_]', re.UNICODE)
+
+
+def extract_word_forms(content):
+    """Unique lower-cased word forms of a lesson, in order of appearance"""
+    forms = {}
+    for token in _TOKEN_SPLIT_RE.split(content):
+        form = _TOKEN_CLEAN_RE.sub('', token).lower()
+        if form and _HAS_LETTER_RE.search(form):
+            forms.setdefault(form, None)
+    return list(forms)
+
+
+def _translate_into(lesson, glossary, forms, entries):
+    """Translate forms into a copy of entries and store it, recording the forms that failed"""
+    results = translate_batch(forms, source='en', target='vi')
+    entries = dict(entries)
+    missing = []
+    for form, result in zip(forms, results):
+        if result.get('translation'):
+            entries[form] = result['translation']
+        else:
+            missing.append(form)
+
+    if glossary:
+        glossary.entries = entries
+        glossary.missing = missing or None
+        glossary.attempted_at = datetime.utcnow()
+    else:
+        glossary = LessonGlossary(
+            lesson_id=lesson.id, entries=entries, missing=missing or None, attempted_at=datetime.utcnow()
+        )
+        db.session.add(glossary)
+    db.session.commit()
+    return glossary
+
+
+def build_lesson_glossary(lesson):
+    """
+    Translate every word form of a lesson in bulk and store the map.
+    translate_batch() reports provider failures per item, so forms that
+    failed are stored as missing and filled in by get_lesson_glossary().
+    """
+    glossary = LessonGlossary.query.filter_by(lesson_id=lesson.id).first()
+    return _translate_into(lesson, glossary, extract_word_forms(lesson.content), {})
+
+
+def _retry_due(glossary):
+    interval = current_app.config.get('GLOSSARY_RETRY_INTERVAL', 300)
+    return glossary.attempted_at is None or glossary.attempted_at <= datetime.utcnow() - timedelta(seconds=interval)
+
+
+def get_lesson_glossary(lesson):
+    """
+    Return the stored glossary of a lesson, building it on first use.
+    Missing forms are retried at most every GLOSSARY_RETRY_INTERVAL
+    seconds, so reads don't hit a failing provider every time.
+    """
+    glossary = LessonGlossary.query.filter_by(lesson_id=lesson.id).first()
+    if glossary is None:
+        glossary = build_lesson_glossary(lesson)
+    elif (glossary.missing or not glossary.entries) and _retry_due(glossary):
+        if glossary.missing:
+            glossary = _translate_into(lesson, glossary, glossary.missing, glossary.entries)
+        else:
+            # Stored before missing forms were recorded, while the provider was down
+            glossary = build_lesson_glossary(lesson)
+    return glossary
+
+
+def init_app(app):
+    """Register the glossary CLI"""
+    app.cli.add_command(glossary_cli)
+
+
+glossary_cli = AppGroup('glossary', help='Manage the per-lesson hover glossaries.')
+
+
+@glossary_cli.command('build')
+@click.option('--all', 'rebuild_all', is_flag=True, help='Rebuild complete glossaries too.')
+def build_command(rebuild_all):
+    """Translate lesson glossaries ahead of time (those missing or incomplete by default)."""
+    from utils.seed import build_glossaries  # utils.seed imports this module
+
+    complete = set() if rebuild_all else {
+        glossary.lesson_id for glossary in LessonGlossary.query.all() if glossary.entries and not glossary.missing
+    }
+    build_glossaries([lesson for lesson in Lesson.query.order_by(Lesson.id).all() if lesson.id not in complete])
@@ -0,0 +1,471 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, request
+from sqlalchemy import event
+
+from extensions import db
+
+# Seconds; covers cached lookups (a few ms) up to upstream deadlines
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+logger = logging.getLogger(__name__)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, registry, name, help, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, tuple(zip(self.labelnames, labels)), value) for labels, value in self._values.items()]
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, registry, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        if not self.registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for labels, (counts, total, count) in self._values.items():
+                base = tuple(zip(self.labelnames, labels))
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    samples.append((f'{self.name}_bucket', base + (('le', _format_value(float(bound))),), cumulative))
+                samples.append((f'{self.name}_bucket', base + (('le', '+Inf'),), count))
+                samples.append((f'{self.name}_sum', base, total))
+                samples.append((f'{self.name}_count', base, count))
+        return samples
+
+
+class Registry:
+    """
+    Minimal Prometheus registry rendered in the text exposition format.
+
+    Instruments (counters, histograms) are updated on the request path
+    and do nothing while the registry is disabled. Collectors turn the
+    stats() of the existing services into metric families at scrape time;
+    ``per_process=False`` marks collectors whose values come from the
+    database and are the same whichever worker answers.
+
+    With ``directory`` set, each process periodically writes a snapshot
+    of its process-local families there and a scrape merges them all:
+    counters and histograms are summed across workers (including ones
+    that have exited), gauges of live workers get a ``pid`` label.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.sync_interval = 5.0
+        self._instruments = []
+        self._collectors = []  # (fn, per_process)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def counter(self, name, help, labelnames=()):
+        instrument = Counter(self, name, help, labelnames)
+        self._instruments.append(instrument)
+        return instrument
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        instrument = Histogram(self, name, help, labelnames, buckets)
+        self._instruments.append(instrument)
+        return instrument
+
+    def add_collector(self, fn, per_process=True):
+        """fn() yields (name, type, help, [(labels dict, value), ...]) families"""
+        self._collectors.append((fn, per_process))
+
+    def _families(self, per_process):
+        families = {}
+        if per_process:
+            for instrument in self._instruments:
+                samples = instrument.samples()
+                if samples:
+                    families[instrument.name] = {'type': instrument.type, 'help': instrument.help, 'samples': samples}
+        for fn, collector_per_process in self._collectors:
+            if collector_per_process != per_process:
+                continue
+            for name, kind, help, values in fn():
+                samples = [(name, tuple(sorted(labels.items())), value) for labels, value in values]
+                families[name] = {'type': kind, 'help': help, 'samples': samples}
+        return families
+
+    # ---- multi-process snapshots ----
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.directory, f'{pid}.json')
+
+    def write_snapshot(self):
+        """Publish this process' families for scrapes answered by other workers"""
+        if not self.directory:
+            return
+        families = {
+            name: dict(family, samples=[[sample, list(map(list, labels)), value]
+                                        for sample, labels, value in family['samples']])
+            for name, family in self._families(per_process=True).items()
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(families, f)
+        os.replace(tmp_path, self._snapshot_path(os.getpid()))
+
+    def ensure_sync_thread(self):
+        # Started lazily so each forked worker publishes its own snapshot
+        if not self.directory or (self._pid == os.getpid() and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run_sync, name='metrics-sync', daemon=True)
+            self._thread.start()
+            atexit.register(self.write_snapshot)
+
+    def _run_sync(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.write_snapshot()
+            except Exception:
+                logger.exception('Writing the metrics snapshot failed')
+
+    def _other_processes(self):
+        """(pid, alive, families) read from the snapshots of other workers"""
+        if not self.directory:
+            return
+        for filename in os.listdir(self.directory):
+            stem, ext = os.path.splitext(filename)
+            if ext != '.json' or not stem.isdigit() or int(stem) == os.getpid():
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    families = json.load(f)
+            except (OSError, ValueError):
+                continue
+            yield int(stem), _pid_alive(int(stem)), families
+
+    def collect(self):
+        """All families: merged process-local ones, database-backed ones and hit ratios"""
+        processes = [(os.getpid(), True, self._families(per_process=True))]
+        for pid, alive, families in self._other_processes():
+            for family in families.values():
+                family['samples'] = [(sample, tuple(map(tuple, labels)), value)
+                                     for sample, labels, value in family['samples']]
+            processes.append((pid, alive, families))
+        multi_process = len(processes) > 1
+
+        merged = {}
+        for pid, alive, families in processes:
+            for name, family in families.items():
+                gauge = family['type'] == 'gauge'
+                if gauge and not alive:
+                    continue  # An exited worker's gauges no longer describe anything
+                target = merged.setdefault(name, {'type': family['type'], 'help': family['help'], 'samples': {}})
+                for sample, labels, value in family['samples']:
+                    if gauge and multi_process:
+                        labels = labels + (('pid', str(pid)),)
+                    key = (sample, labels)
+                    target['samples'][key] = target['samples'].get(key, 0) + value
+
+        for name, family in self._families(per_process=False).items():
+            merged[name] = dict(family, samples={(sample, labels): value for sample, labels, value in family['samples']})
+
+        merged.update(_hit_ratios(merged))
+        return merged
+
+    def render(self):
+        lines = []
+        for name, family in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for (sample, labels), value in family['samples'].items():
+                label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels)
+                lines.append(f"{sample}{{{label_text}}} {_format_value(value)}" if labels
+                             else f"{sample} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _hit_ratios(families):
+    """cache_hit_ratio per cache, from the (merged) hit and miss counters"""
+    totals = {}
+    for name, index in (('cache_hits_total', 0), ('cache_misses_total', 1)):
+        for (_sample, labels), value in families.get(name, {}).get('samples', {}).items():
+            totals.setdefault(labels, [0, 0])[index] += value
+    samples = {('cache_hit_ratio', labels): round(hits / (hits + misses), 4)
+               for labels, (hits, misses) in totals.items() if hits + misses}
+    if not samples:
+        return {}
+    return {'cache_hit_ratio': {'type': 'gauge', 'help': 'Share of cache lookups answered by the cache',
+                                'samples': samples}}
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'Time to produce a response, per route', ('endpoint', 'method')
+)
+REQUESTS = registry.counter('http_requests_total', 'Responses per route and status', ('endpoint', 'method', 'status'))
+REQUEST_QUERIES = registry.histogram(
+    'http_request_db_queries', 'SQL statements executed per request', ('endpoint',), QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = registry.histogram(
+    'http_request_db_seconds', 'Time spent in SQL statements per request', ('endpoint',)
+)
+QUERY_SECONDS = registry.histogram('db_query_duration_seconds', 'Duration of each SQL statement', (), QUERY_BUCKETS)
+UPSTREAM_SECONDS = registry.histogram(
+    'upstream_request_duration_seconds', 'Duration of calls to Google translate/TTS', ('service',)
+)
+UPSTREAM_ERRORS = registry.counter(
+    'upstream_errors_total', 'Failed calls to Google translate/TTS by exception', ('service', 'error')
+)
+
+# Per-thread state of the request being served: [start, queries, seconds in SQL]
+_local = threading.local()
+
+
+@contextmanager
+def upstream_timer(service):
+    """Time a call to an upstream provider and count its failures"""
+    if not registry.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(service, type(e).__name__)
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, service)
+
+
+def _before_request():
+    _local.request = [time.perf_counter(), 0, 0.0]
+
+
+def _after_request(response):
+    state = getattr(_local, 'request', None)
+    if state is None:
+        return response
+    _local.request = None
+    # Unmatched URLs share one label so random paths can't create series
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_SECONDS.observe(time.perf_counter() - state[0], endpoint, request.method)
+    REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    REQUEST_QUERIES.observe(state[1], endpoint)
+    REQUEST_DB_SECONDS.observe(state[2], endpoint)
+    registry.ensure_sync_thread()
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_metrics_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    QUERY_SECONDS.observe(elapsed)
+    state = getattr(_local, 'request', None)
+    if state is not None:
+        state[1] += 1
+        state[2] += elapsed
+
+
+def metrics_view():
+    """Prometheus scrape endpoint"""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+# ---- collectors over existing service stats ----
+
+def _counter(name, help, value, **labels):
+    return name, 'counter', help, [(labels, value)]
+
+
+def _gauge(name, help, value, **labels):
+    return name, 'gauge', help, [(labels, value)]
+
+
+def _collect_caches():
+    from services import dictionary, translation, tts
+
+    counters = translation.get_counters()
+    caches = {
+        'translation_memory': translation.memory_cache.stats(),
+        'translation_db': {'hits': counters['db_hits'], 'misses': counters['db_misses']},
+        'dictionary_lru': dictionary.store.cache.stats(),
+        'tts_audio': tts.get_cache_stats(),
+    }
+    dictionary_stats = dictionary.store.stats()
+    if dictionary_stats['available']:
+        caches['dictionary'] = dictionary_stats
+
+    yield 'cache_hits_total', 'counter', 'Cache lookups answered by the cache', [
+        ({'cache': name}, cache['hits']) for name, cache in caches.items()
+    ]
+    yield 'cache_misses_total', 'counter', 'Cache lookups that fell through', [
+        ({'cache': name}, cache['misses']) for name, cache in caches.items()
+    ]
+    yield 'cache_entries', 'gauge', 'Entries held by in-process caches', [
+        ({'cache': name}, caches[name]['size']) for name in ('translation_memory', 'dictionary_lru')
+    ]
+    yield _gauge('tts_audio_cache_bytes', 'Approximate size of the TTS audio cache directory',
+                 caches['tts_audio']['bytes'] or 0)
+
+    yield _counter('translation_dictionary_hits_total', 'Translations answered by the offline dictionary',
+                   counters['dictionary_hits'])
+    yield _counter('translation_upstream_calls_total', 'Upstream translate calls', counters['upstream_calls'])
+    yield _counter('translation_stale_served_total', 'Expired translations served after an upstream failure',
+                   counters['stale_served'])
+
+
+def _collect_upstream():
+    from services import offload, translation, tts
+
+    pool = offload.pool.stats()
+    yield _gauge('upstream_pool_workers', 'Threads of the upstream offload pool', pool['max_workers'])
+    yield _counter('upstream_pool_completed_total', 'Upstream calls finished in the pool', pool['completed'])
+    yield _counter('upstream_pool_rejected_total', 'Upstream calls refused because the pool was full',
+                   pool['rejected'])
+    yield _counter('upstream_pool_timeouts_total', 'Upstream calls whose caller gave up at the deadline',
+                   pool['timeouts'])
+
+    flights = {'translate': translation.flight.stats(), 'tts': tts.flight.stats()}
+    yield 'singleflight_leaders_total', 'counter', 'Calls that executed for their key', [
+        ({'service': name}, flight['leaders']) for name, flight in flights.items()
+    ]
+    yield 'singleflight_coalesced_total', 'counter', 'Calls that waited on another call for the same key', [
+        ({'service': name}, flight['coalesced']) for name, flight in flights.items()
+    ]
+    yield 'singleflight_in_flight', 'gauge', 'Keys currently being computed', [
+        ({'service': name}, flight['in_flight']) for name, flight in flights.items()
+    ]
+
+
+def _collect_background():
+    from services import search, write_behind
+
+    buffer = write_behind.review_buffer.stats()
+    yield _gauge('write_behind_pending', 'Practice results waiting to be written', buffer['pending'])
+    yield _counter('write_behind_flushes_total', 'Write-behind flushes', buffer['flushes'])
+    yield _counter('write_behind_flushed_results_total', 'Practice results written by flushes',
+                   buffer['flushed_results'])
+    yield _counter('write_behind_errors_total', 'Failed write-behind flushes', buffer['errors'])
+
+    index = search.index.stats()
+    yield _gauge('search_index_documents', 'Documents in the in-process search index', index['documents'])
+    yield _gauge('search_index_tokens', 'Distinct words in the in-process search index', index['tokens'])
+
+
+def _collect_tts_queue():
+    from services.tts_queue import queue
+
+    stats = queue.stats()
+    yield 'tts_prerender_jobs', 'gauge', 'TTS pre-render jobs per status', [
+        ({'status': status}, stats[status]) for status in ('pending', 'running', 'done', 'failed')
+    ]
+    yield _gauge('tts_prerender_oldest_pending_seconds', 'Age of the oldest pending pre-render job',
+                 stats['oldest_pending_seconds'] or 0)
+
+
+registry.add_collector(_collect_caches)
+registry.add_collector(_collect_upstream)
+registry.add_collector(_collect_background)
+registry.add_collector(_collect_tts_queue, per_process=False)
+
+
+def init_app(app):
+    """Instrument the app and serve /metrics when METRICS_ENABLED is set"""
+    registry.enabled = app.config.get('METRICS_ENABLED', False)
+    if not registry.enabled:
+        return  # No hooks or listeners at all - nothing on the request path
+
+    registry.directory = app.config.get('METRICS_DIR')
+    registry.sync_interval = app.config.get('METRICS_SYNC_INTERVAL', registry.sync_interval)
+    if registry.directory:
+        os.makedirs(registry.directory, exist_ok=True)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
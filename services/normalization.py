@@ -0,0 +1,304 @@
+import re
+import threading
+import unicodedata
+
+from services import dictionary
+from services.cache import LRUCache
+
+# Typographic variants folded to their ASCII counterparts before anything else
+_PUNCTUATION_MAP = str.maketrans({
+    '\u2018': "'", '\u2019': "'", '\u02bc': "'", '\u2032': "'", '`': "'",
+    '\u201c': '"', '\u201d': '"', '\u2033': '"',
+    '\u2010': '-', '\u2011': '-', '\u2012': '-', '\u2013': '-', '\u2014': '-', '\u2212': '-',
+    '\u200b': '',
+})
+_WHITESPACE_RE = re.compile(r'\s+')
+_EDGE_PUNCTUATION_RE = re.compile(r"^[\W_]+|[\W_]+$", re.UNICODE)
+_WORD_RE = re.compile(r"^[a-z]+(?:['-][a-z]+)*$")
+
+# "'s" that isn't a possessive
+_S_CONTRACTIONS = frozenset((
+    "it's", "let's", "he's", "she's", "that's", "what's", "there's", "here's", "who's", "where's", "how's",
+))
+
+# Irregular inflections as "lemma: forms". Forms that are also common words
+# in their own right (saw, left, found, rose, fell, bit, shot, ...) are left
+# out - lemmatizing them would merge unrelated cards and translations.
+_IRREGULAR_TABLE = """
+be: am is are was were been being
+have: has had having
+do: does did done doing
+go: goes went gone
+arise: arose arisen
+awake: awoke awoken
+beat: beaten
+become: became
+begin: began begun
+bend: bent
+bite: bitten
+blow: blew blown
+break: broke broken
+bring: brought
+build: built
+burn: burnt
+buy: bought
+catch: caught
+choose: chose chosen
+come: came
+deal: dealt
+die: died dying
+dig: dug
+draw: drew drawn
+dream: dreamt
+drink: drank drunk
+drive: drove driven
+eat: ate eaten
+fall: fallen
+feed: fed
+feel: felt
+fight: fought
+flee: fled
+fly: flew flown
+forget: forgot forgotten
+forgive: forgave forgiven
+freeze: froze frozen
+get: got gotten
+give: gave given
+grow: grew grown
+hang: hung
+hear: heard
+hide: hid hidden
+hold: held
+keep: kept
+know: knew known
+lay: laid
+lead: led
+learn: learnt
+lend: lent
+lie: lain lied lying
+lose: lost
+make: made
+mean: meant
+meet: met
+pay: paid
+ride: rode ridden
+ring: rang rung
+rise: risen
+run: ran
+say: said
+see: seen
+seek: sought
+sell: sold
+send: sent
+shake: shook shaken
+shine: shone
+show: shown
+sing: sang sung
+sink: sank sunk
+sit: sat
+sleep: slept
+slide: slid
+speak: spoke spoken
+spend: spent
+stand: stood
+steal: stole stolen
+stick: stuck
+sting: stung
+strike: struck
+swear: swore sworn
+sweep: swept
+swim: swam swum
+take: took taken
+teach: taught
+tear: tore torn
+tell: told
+think: thought
+throw: threw thrown
+tie: tied tying
+understand: understood
+wake: woke woken
+wear: wore worn
+win: won
+write: wrote written
+child: children
+man: men
+woman: women
+foot: feet
+tooth: teeth
+mouse: mice
+goose: geese
+wife: wives
+knife: knives
+wolf: wolves
+half: halves
+shelf: shelves
+potato: potatoes
+tomato: tomatoes
+hero: heroes
+"""
+
+# Words that look inflected but aren't, or whose -ing/-ed form is a word with
+# its own meaning (interesting != interest, shopping != shop)
+_NOT_INFLECTED = frozenset("""
+always perhaps sometimes besides towards afterwards upstairs downstairs indoors outdoors whereas overseas
+news series species physics mathematics maths economics politics lens bus gas yes this his its thus plus
+less unless across chaos bias atlas canvas christmas clothes glasses trousers jeans pants scissors thanks
+ourselves themselves yourselves
+during morning evening nothing something anything everything ceiling building meeting wedding pudding
+clothing feeling painting shopping interesting boring amazing exciting surprising annoying charming
+bed red hundred sacred naked wicked need feed seed speed weed indeed breed bleed greed shed wed
+tired bored excited interested surprised worried pleased scared confused beloved
+""".split())
+
+# (suffix, replacements) tried in order when the dictionary can confirm the
+# candidate; None means "undouble the final consonant". Comparatives are only
+# undone this way - water, number and rest are not comparatives.
+_SUFFIX_RULES = (
+    ('ies', ('y',)),
+    ('ied', ('y',)),
+    ('iest', ('y',)),
+    ('ier', ('y',)),
+    ('sses', ('ss',)),
+    ('ches', ('ch',)),
+    ('shes', ('sh',)),
+    ('xes', ('x',)),
+    ('zzes', ('zz',)),
+    ('oes', ('o',)),
+    ('ing', (None, '', 'e')),
+    ('ed', (None, '', 'e')),
+    ('est', (None, '', 'e')),
+    ('er', (None, '', 'e')),
+    ('es', ('e', '')),
+    ('s', ('',)),
+)
+
+_VOWELS = frozenset('aeiou')
+
+
+def _parse_irregular(table):
+    forms = {}
+    for line in table.strip().splitlines():
+        lemma, _sep, inflected = line.partition(':')
+        for form in inflected.split():
+            forms[form] = lemma.strip()
+    return forms
+
+
+def _vowel_groups(stem):
+    groups = 0
+    previous = False
+    for ch in stem:
+        is_vowel = ch in _VOWELS
+        if is_vowel and not previous:
+            groups += 1
+        previous = is_vowel
+    return groups
+
+
+def _drops_e(stem):
+    """True if stem looks like a silent-e word minus its e: mak(ing), hop(ed) -> make, hope"""
+    return (_vowel_groups(stem) == 1 and stem[-1] not in _VOWELS and stem[-1] not in 'wxy'
+            and stem[-2] in _VOWELS and (len(stem) < 3 or stem[-3] not in _VOWELS))
+
+
+class Lemmatizer:
+    """
+    Rule- and table-based English lemmatizer.
+
+    Irregular forms come from a precomputed form -> lemma map. Regular
+    inflections are undone with suffix rules, and only when the offline
+    dictionary confirms the candidate as a headword; a form that is
+    itself a headword (building, interested) is kept. Without a
+    dictionary regular forms are left as they are - guessed stems
+    (texas -> texa, buses -> buse) would merge unrelated words.
+    Results are memoized per process.
+    """
+
+    def __init__(self, cache_size=100000):
+        self.forms = _parse_irregular(_IRREGULAR_TABLE)
+        self.memo = LRUCache(maxsize=cache_size)
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def _validated_lemma(self, word):
+        if dictionary.store.contains(word):
+            return word
+        for suffix, replacements in _SUFFIX_RULES:
+            if not word.endswith(suffix) or len(word) <= len(suffix) + 1:
+                continue
+            stem = word[:-len(suffix)]
+            if replacements == (None, '', 'e') and _drops_e(stem):
+                replacements = (None, 'e', '')  # hoping -> hope, not hop
+            for replacement in replacements:
+                if replacement is None:
+                    if len(stem) < 3 or stem[-1] != stem[-2] or stem[-1] in _VOWELS:
+                        continue
+                    candidate = stem[:-1]
+                else:
+                    candidate = stem + replacement
+                if dictionary.store.contains(candidate):
+                    return candidate
+        return word
+
+    def lemmatize(self, word):
+        """Lemma of a single lower-cased word"""
+        if word in self.forms:
+            return self.forms[word]
+        if len(word) <= 3 or word in _NOT_INFLECTED or "'" in word or not _WORD_RE.match(word):
+            return word  # Short, exempt, a contraction (it's, don't) or not an English word
+
+        # Headword checks depend on the dictionary file - start over when it's replaced
+        generation = dictionary.store.generation
+        if generation != self._generation:
+            with self._lock:
+                if generation != self._generation:
+                    self.memo.clear()
+                    self._generation = generation
+
+        lemma = self.memo.get(word)
+        if lemma is None:
+            # Without a dictionary there is nothing to confirm a stripped candidate against
+            lemma = self._validated_lemma(word) if dictionary.store.available else word
+            self.memo.set(word, lemma)
+        return lemma
+
+
+lemmatizer = Lemmatizer()
+
+
+def clean_text(text):
+    """NFKC-normalize, fold typographic quotes and dashes, collapse whitespace and lower-case"""
+    text = unicodedata.normalize('NFKC', text).translate(_PUNCTUATION_MAP)
+    return _WHITESPACE_RE.sub(' ', text).strip().lower()
+
+
+def clean_word(word):
+    """A cleaned single word without surrounding punctuation or a possessive 's"""
+    word = _EDGE_PUNCTUATION_RE.sub('', clean_text(word))
+    if word.endswith("'s") and word not in _S_CONTRACTIONS:
+        word = word[:-2]
+    return word
+
+
+def surface_term(text):
+    """
+    The text as typed, cleaned: a single word without surrounding
+    punctuation ("Running," -> "running"), or the cleaned phrase. This is
+    what gets translated and what keys the translation cache.
+    """
+    cleaned = clean_text(text)
+    if ' ' in cleaned:
+        return cleaned
+    return clean_word(cleaned) or cleaned
+
+
+def normalize_term(text):
+    """
+    Key for dictionary lookups and duplicate detection: the lemma of a
+    single word ("Running," -> "run" when the dictionary confirms it), or
+    the cleaned text of a phrase or sentence.
+    """
+    term = surface_term(text)
+    if ' ' in term:
+        return term
+    return lemmatizer.lemmatize(term)
@@ -0,0 +1,117 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app, has_app_context
+
+from services.profiling import profiler
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream-bound call was not admitted or missed its deadline"""
+
+
+class UpstreamBusy(UpstreamUnavailable):
+    pass
+
+
+class UpstreamTimeout(UpstreamUnavailable):
+    pass
+
+
+class UpstreamPool:
+    """
+    Bounded thread pool for calls to slow upstream services.
+
+    At most ``max_workers`` calls run at once and ``max_queue`` more may
+    wait; anything beyond that is rejected immediately with UpstreamBusy.
+    The caller waits at most ``deadline`` seconds (UpstreamTimeout) while
+    the call itself runs to completion in the pool. Slow upstreams
+    therefore tie up a bounded number of request threads, leaving the
+    rest for database-only endpoints.
+    """
+
+    def __init__(self, max_workers=8, max_queue=8):
+        self.enabled = True
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._rejected = 0
+        self._timeouts = 0
+        self._completed = 0
+        self.configure(max_workers, max_queue)
+
+    def configure(self, max_workers, max_queue):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor = None
+
+    def _get_executor(self):
+        # Created lazily so each forked worker gets its own threads
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='upstream')
+            return self._executor
+
+    def _release(self, _future):
+        self._slots.release()
+        with self._lock:
+            self._completed += 1
+
+    def call(self, fn, deadline=None):
+        """Run fn() in the pool (inside the current app context) and wait up to ``deadline`` seconds"""
+        # A profiled request keeps the work on its own thread, where the profiler can see it
+        if not self.enabled or profiler.active():
+            return fn()
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise UpstreamBusy('Too many upstream calls in progress')
+
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def task():
+            if app is None:
+                return fn()
+            with app.app_context():
+                return fn()
+
+        try:
+            future = self._get_executor().submit(task)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=deadline)
+        except FutureTimeout:
+            with self._lock:
+                self._timeouts += 1
+            raise UpstreamTimeout(f'Upstream call exceeded its {deadline}s deadline')
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'timeouts': self._timeouts,
+            }
+
+
+pool = UpstreamPool()
+
+
+def init_app(app):
+    """Configure the upstream pool from app config"""
+    pool.enabled = app.config.get('UPSTREAM_OFFLOAD', True)
+    pool.configure(
+        app.config.get('UPSTREAM_POOL_SIZE', 8),
+        app.config.get('UPSTREAM_QUEUE_SIZE', 8)
+    )
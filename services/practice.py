@@ -0,0 +1,139 @@
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import bindparam, select, update
+
+from extensions import db
+from models import Vocabulary
+from services.versioning import bump_version
+from services.srs import QUALITY_REVIEWED, next_schedule, parse_quality, quality_from_result
+
+# Ids per SELECT ... IN (...) - well below SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+RESULT_TYPES = ('typing', 'speech', 'review')
+
+# answered_at defaults to the time the result is applied
+PracticeResult = namedtuple('PracticeResult', 'vocab_id kind correct quality answered_at', defaults=(None,))
+
+
+def parse_results(items):
+    """
+    Validate practice results from a request body.
+
+    Each item is {"id", "type": typing|speech|review, "correct"?, "quality"?}.
+    Returns a list of PracticeResult; raises ValueError.
+    """
+    if not isinstance(items, list):
+        raise ValueError('results must be a list')
+
+    results = []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f'results[{position}] must be an object')
+        vocab_id = item.get('id')
+        kind = item.get('type')
+        if isinstance(vocab_id, bool) or not isinstance(vocab_id, int):
+            raise ValueError(f'results[{position}].id must be an integer')
+        if kind not in RESULT_TYPES:
+            raise ValueError(f"results[{position}].type must be one of {', '.join(RESULT_TYPES)}")
+
+        correct = bool(item.get('correct', False))
+        default = QUALITY_REVIEWED if kind == 'review' else quality_from_result(correct)
+        try:
+            quality = parse_quality(item.get('quality'), default)
+        except ValueError as e:
+            raise ValueError(f'results[{position}].{e}')
+        results.append(PracticeResult(vocab_id, kind, correct, quality))
+    return results
+
+
+def existing_ids(ids):
+    """Return the subset of ids that are saved vocabulary items"""
+    found = set()
+    for i in range(0, len(ids), CHUNK_SIZE):
+        rows = db.session.execute(select(Vocabulary.id).where(Vocabulary.id.in_(ids[i:i + CHUNK_SIZE])))
+        found.update(vocab_id for (vocab_id,) in rows)
+    return found
+
+
+def _lock_schedules(ids):
+    """Current SM-2 state per card, locked until commit where the database supports it"""
+    state = {}
+    for i in range(0, len(ids), CHUNK_SIZE):
+        rows = db.session.execute(
+            select(Vocabulary.id, Vocabulary.ease, Vocabulary.interval_days, Vocabulary.repetitions)
+            .where(Vocabulary.id.in_(ids[i:i + CHUNK_SIZE]))
+            .with_for_update()
+        )
+        state.update((row.id, (row.ease, row.interval_days, row.repetitions)) for row in rows)
+    return state
+
+
+def apply_practice_results(results, now=None, commit=True):
+    """
+    Apply parsed practice results in a single transaction.
+
+    Results are grouped per card: counters are incremented SQL-side
+    (``col = col + n``) so concurrent submissions never lose updates,
+    and the SM-2 schedule is replayed over the card's answers in order
+    from its locked row. Returns the ids that don't exist. With
+    ``commit=False`` the caller commits the open transaction.
+    """
+    now = now or datetime.utcnow()
+
+    grouped = {}
+    for result in results:
+        card = grouped.setdefault(result.vocab_id, {'reviews': 0, 'typing': 0, 'speech': 0, 'answers': []})
+        card['reviews'] += 1
+        if result.correct and result.kind in ('typing', 'speech'):
+            card[result.kind] += 1
+        card['answers'].append((result.answered_at or now, result.quality))
+
+    if not grouped:
+        return []
+
+    schedules = _lock_schedules(list(grouped))
+    params = []
+    for vocab_id, card in grouped.items():
+        if vocab_id not in schedules:
+            continue
+        ease, interval_days, repetitions = schedules[vocab_id]
+        for answered_at, quality in card['answers']:
+            ease, interval_days, repetitions, next_due = next_schedule(
+                ease, interval_days, repetitions, quality, answered_at
+            )
+        params.append({
+            'vocab_id': vocab_id,
+            'reviews': card['reviews'],
+            'typing': card['typing'],
+            'speech': card['speech'],
+            'new_ease': ease,
+            'new_interval': interval_days,
+            'new_repetitions': repetitions,
+            'new_next_due': next_due,
+            'reviewed_at': max(answered_at for answered_at, _quality in card['answers']),
+        })
+
+    if params:
+        # One executemany for every card in the batch
+        stmt = (
+            update(Vocabulary.__table__)
+            .where(Vocabulary.__table__.c.id == bindparam('vocab_id'))
+            .values(
+                review_count=Vocabulary.__table__.c.review_count + bindparam('reviews'),
+                typing_correct=Vocabulary.__table__.c.typing_correct + bindparam('typing'),
+                speech_correct=Vocabulary.__table__.c.speech_correct + bindparam('speech'),
+                ease=bindparam('new_ease'),
+                interval_days=bindparam('new_interval'),
+                repetitions=bindparam('new_repetitions'),
+                next_due=bindparam('new_next_due'),
+                last_reviewed=bindparam('reviewed_at'),
+            )
+        )
+        db.session.execute(stmt, params)
+        bump_version(Vocabulary.__tablename__)
+    if commit:
+        db.session.commit()
+
+    return [vocab_id for vocab_id in grouped if vocab_id not in schedules]
@@ -0,0 +1,284 @@
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import event
+
+from extensions import db
+
+MODES = ('cprofile', 'sample')
+
+# Profile ids are generated here; anything else in a URL is rejected
+_PROFILE_ID_RE = re.compile(r'^\d{8}T\d{12}-[0-9a-f]{8}$')
+
+_EXTENSIONS = {'cprofile': '.prof', 'sample': '.folded'}
+
+# Sampled stacks keep at most this many innermost frames
+_MAX_STACK_DEPTH = 200
+
+
+class StackSampler:
+    """
+    Statistical profiler for one thread.
+
+    A background thread looks at the target thread's stack every
+    ``interval`` seconds and counts identical stacks. The result is in
+    the collapsed "frame;frame;frame count" format read by flamegraph.pl
+    and speedscope. Unlike cProfile the profiled code runs at full speed.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enable(self):
+        self._thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                return
+            names = []
+            while frame is not None and len(names) < _MAX_STACK_DEPTH:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def dump_stats(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class RequestProfiler:
+    """
+    Opt-in per-request profiling.
+
+    A request is profiled when it carries the profiling header with the
+    admin token, or is picked at ``sample_rate``. The profiler runs from
+    before_request until the request is torn down or, for streamed
+    responses, until the response has been sent and closed. Each profile is written to ``directory``
+    with a JSON sidecar (route, status, duration, SQL statements) and
+    only the newest ``max_files`` are kept.
+
+    Both profilers only see the request thread, so a profiled request
+    makes upstream calls inline instead of through services/offload.py
+    (see ``active()``); its upstream deadline is not enforced. Chunks
+    rendered by /api/tts/stream's own executor are still not covered.
+
+    While disabled no hooks are installed. While enabled, requests that
+    are not picked cost one header lookup and one random number.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.token = None
+        self.header = 'X-Profile'
+        self.sample_rate = 0.0
+        self.mode = 'cprofile'
+        self.sample_interval = 0.005
+        self.max_files = 100
+        self._local = threading.local()
+        self._rotate_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.directory = app.config.get('PROFILING_DIR') or os.path.join(app.instance_path, 'profiles')
+        self.token = app.config.get('PROFILING_TOKEN')
+        self.header = app.config.get('PROFILING_HEADER', self.header)
+        self.sample_rate = app.config.get('PROFILING_SAMPLE_RATE', self.sample_rate)
+        self.mode = app.config.get('PROFILING_MODE', self.mode)
+        self.sample_interval = app.config.get('PROFILING_SAMPLE_INTERVAL', self.sample_interval)
+        self.max_files = app.config.get('PROFILING_MAX_FILES', self.max_files)
+        if self.mode not in MODES:
+            raise ValueError(f'PROFILING_MODE must be one of {", ".join(MODES)}')
+        if not self.enabled:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        with app.app_context():
+            engine = db.engine
+        if not event.contains(engine, 'after_cursor_execute', self._count_query):
+            event.listen(engine, 'before_cursor_execute', self._start_query)
+            event.listen(engine, 'after_cursor_execute', self._count_query)
+
+    def check_token(self, value):
+        """True if value is the configured admin token (never true without one)"""
+        return bool(self.token) and bool(value) and hmac.compare_digest(value.encode(), self.token.encode())
+
+    def active(self):
+        """True while the current thread's request is being profiled"""
+        return getattr(self._local, 'state', None) is not None
+
+    def _wanted(self):
+        requested = request.headers.get(self.header)
+        if requested is not None:
+            return self.check_token(requested)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    # ---- request hooks ----
+
+    def _before_request(self):
+        if request.blueprint == 'admin' or not self._wanted():
+            return
+        profiler = cProfile.Profile() if self.mode == 'cprofile' else StackSampler(self.sample_interval)
+        try:
+            profiler.enable()
+        except ValueError:
+            return  # Python 3.12+ allows one cProfile at a time per process
+        self._local.state = {
+            'profiler': profiler,
+            'start': time.perf_counter(),
+            'queries': 0,
+            'db_seconds': 0.0,
+            'status': None,
+            'streamed': False,
+            'trigger': 'header' if self.header in request.headers else 'sample',
+            'method': request.method,
+            'path': request.path,
+            'route': request.url_rule.rule if request.url_rule else None,
+            'endpoint': request.endpoint,
+        }
+
+    def _after_request(self, response):
+        state = getattr(self._local, 'state', None)
+        if state is not None:
+            state['status'] = response.status_code
+            if response.is_streamed:
+                # The body is generated after teardown; finish once it has been sent
+                state['streamed'] = True
+                response.call_on_close(lambda: self._finish(state, None))
+        return response
+
+    def _teardown_request(self, error):
+        state = getattr(self._local, 'state', None)
+        if state is not None and (error is not None or not state['streamed']):
+            self._finish(state, error)
+
+    def _finish(self, state, error):
+        if state.get('finished'):
+            return
+        state['finished'] = True
+        if getattr(self._local, 'state', None) is state:
+            self._local.state = None
+        state['profiler'].disable()
+        duration = time.perf_counter() - state['start']
+        try:
+            self._save(state, duration, error)
+        except OSError:
+            pass  # A full disk must not fail the request being profiled
+
+    def _start_query(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and getattr(self._local, 'state', None) is not None:
+            context._profile_start = time.perf_counter()
+
+    def _count_query(self, conn, cursor, statement, parameters, context, executemany):
+        state = getattr(self._local, 'state', None)
+        start = getattr(context, '_profile_start', None)
+        if state is not None and start is not None:
+            state['queries'] += 1
+            state['db_seconds'] += time.perf_counter() - start
+
+    # ---- storage ----
+
+    def _save(self, state, duration, error):
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        filename = profile_id + _EXTENSIONS[self.mode]
+        state['profiler'].dump_stats(os.path.join(self.directory, filename))
+
+        metadata = {
+            'id': profile_id,
+            'file': filename,
+            'mode': self.mode,
+            'trigger': state['trigger'],
+            'created_at': datetime.utcnow().isoformat() + 'Z',
+            'method': state['method'],
+            'path': state['path'],
+            'route': state['route'],
+            'endpoint': state['endpoint'],
+            'status': state['status'] if error is None else 500,
+            'error': repr(error) if error is not None else None,
+            'duration_ms': round(duration * 1000, 2),
+            'db_queries': state['queries'],
+            'db_ms': round(state['db_seconds'] * 1000, 2),
+            'pid': os.getpid(),
+        }
+        tmp_path = os.path.join(self.directory, profile_id + '.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, os.path.join(self.directory, profile_id + '.json'))
+        self._rotate()
+
+    def _rotate(self):
+        """Delete the oldest profiles beyond max_files"""
+        with self._rotate_lock:
+            ids = sorted(self._profile_ids())
+            for profile_id in ids[:max(0, len(ids) - self.max_files)]:
+                for extension in ('.json', *_EXTENSIONS.values()):
+                    try:
+                        os.remove(os.path.join(self.directory, profile_id + extension))
+                    except FileNotFoundError:
+                        pass
+
+    def _profile_ids(self):
+        try:
+            filenames = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [name[:-5] for name in filenames if name.endswith('.json') and _PROFILE_ID_RE.match(name[:-5])]
+
+    def list_profiles(self, limit=None):
+        """Metadata of stored profiles, newest first"""
+        profiles = []
+        for profile_id in sorted(self._profile_ids(), reverse=True)[:limit]:
+            metadata = self.get_profile(profile_id)
+            if metadata is not None:
+                profiles.append(metadata)
+        return profiles
+
+    def get_profile(self, profile_id):
+        """Metadata of one profile, or None"""
+        if not _PROFILE_ID_RE.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, profile_id + '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def profile_path(self, metadata):
+        return os.path.join(self.directory, metadata['id'] + _EXTENSIONS[metadata['mode']])
+
+
+profiler = RequestProfiler()
+
+
+def init_app(app):
+    """Install the profiling hooks when PROFILING_ENABLED is set"""
+    profiler.init_app(app)
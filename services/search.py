@@ -0,0 +1,270 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+
+from sqlalchemy import case, func, literal, literal_column, or_, select, union_all
+
+from extensions import db
+from models import Lesson, Vocabulary
+from services.normalization import clean_text
+from services.versioning import VOCABULARY_TEXT, get_versions
+
+KINDS = ('vocabulary', 'lesson')
+
+# Searched fields per result type, with PostgreSQL-style weights (A most important).
+# Must match the columns of the ix_*_search indexes in models.py.
+SOURCES = {
+    'vocabulary': (Vocabulary, (('word', 'A'), ('translation', 'B'), ('example_en', 'C'), ('example_vi', 'C'))),
+    'lesson': (Lesson, (('title', 'A'), ('content', 'C'))),
+}
+
+# Columns returned per result type (lesson content becomes a snippet)
+RESULT_FIELDS = {
+    'vocabulary': ('id', 'word', 'translation', 'phonetic', 'level'),
+    'lesson': ('id', 'title', 'level', 'category', 'content'),
+}
+
+# Same ratios as ts_rank's default weights for A/B/C
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2}
+
+# A word that only starts with the query term counts half as much as the whole word
+PREFIX_FACTOR = 0.5
+
+# Query terms used; more words rarely change the results
+MAX_TERMS = 8
+
+# Indexed words a short prefix may expand to (type-ahead on one or two letters)
+MAX_PREFIX_EXPANSIONS = 200
+
+SNIPPET_CHARS = 160
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Lower-cased words of a text, split the way PostgreSQL's 'simple' parser does"""
+    return _TOKEN_RE.findall(clean_text(text))
+
+
+class InvertedIndex:
+    """
+    In-process inverted index used when the database has no full-text search.
+
+    Maps every word of the searched fields to the documents containing it
+    and the summed field weight. Before each query the versions of the
+    searched text are compared with the ones the index was built from; a
+    changed table is re-read and only rows whose text differs are
+    re-indexed. Vocabulary is versioned on its text alone, so practice
+    answers (which only touch SRS counters) never cause a re-read.
+    Prefix matches come from a sorted word list.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._docs = {}  # (kind, id) -> indexed field values
+        self._doc_tokens = {}  # (kind, id) -> {token: weight}
+        self._postings = {}  # token -> {(kind, id): weight}
+        self._phrases = {}  # tokenized word/title -> {(kind, id)}, for exact-match boosts
+        self._tokens = []
+        self._tokens_dirty = False
+
+    def sync(self):
+        """Bring the index up to date with the database"""
+        tables = {Lesson.__tablename__: 'lesson', VOCABULARY_TEXT: 'vocabulary'}
+        versions = get_versions(list(tables))
+        with self._lock:
+            for table, kind in tables.items():
+                if self._versions.get(table) != versions[table]:
+                    self._sync_kind(kind)
+                    self._versions[table] = versions[table]
+
+    def _sync_kind(self, kind):
+        model, fields = SOURCES[kind]
+        columns = [model.id] + [getattr(model, name) for name, _weight in fields]
+        seen = set()
+        for row in db.session.connection().execute(select(*columns)):
+            key = (kind, row[0])
+            values = tuple(row[1:])
+            seen.add(key)
+            if self._docs.get(key) != values:
+                self._remove(key)
+                self._add(key, values, fields)
+        for key in [key for key in self._docs if key[0] == kind and key not in seen]:
+            self._remove(key)
+
+    def _add(self, key, values, fields):
+        tokens = {}
+        for value, (_name, weight) in zip(values, fields):
+            for token in tokenize(value or ''):
+                tokens[token] = tokens.get(token, 0.0) + WEIGHTS[weight]
+        for token, weight in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._tokens_dirty = True
+            postings[key] = weight
+        self._docs[key] = values
+        self._doc_tokens[key] = tokens
+        self._phrases.setdefault(' '.join(tokenize(values[0] or '')), set()).add(key)
+
+    def _remove(self, key):
+        values = self._docs.pop(key, None)
+        if values is not None:
+            phrase = ' '.join(tokenize(values[0] or ''))
+            self._phrases[phrase].discard(key)
+            if not self._phrases[phrase]:
+                del self._phrases[phrase]
+        for token in self._doc_tokens.pop(key, ()):
+            postings = self._postings[token]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[token]
+                self._tokens_dirty = True
+
+    def _expand(self, term):
+        """(token, factor) pairs matching a query term: the word itself and words it prefixes"""
+        if self._tokens_dirty:
+            self._tokens = sorted(self._postings)
+            self._tokens_dirty = False
+        if term in self._postings:
+            yield term, 1.0
+        start = bisect.bisect_right(self._tokens, term)
+        for token in self._tokens[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(term):
+                break
+            yield token, PREFIX_FACTOR
+
+    def search(self, terms, kinds, count):
+        """The ``count`` best (kind, id, score) matching every term"""
+        phrase = ' '.join(terms)
+        with self._lock:
+            n_docs = len(self._docs) or 1
+            total = None
+            for term in terms:
+                scores = {}
+                for token, factor in self._expand(term):
+                    postings = self._postings[token]
+                    idf = math.log(1 + n_docs / len(postings))
+                    for key, weight in postings.items():
+                        if key[0] not in kinds:
+                            continue
+                        # Saturating term frequency: repeated words help, but less and less
+                        score = factor * idf * weight / (weight + 1)
+                        if score > scores.get(key, 0.0):
+                            scores[key] = score
+                if total is None:
+                    total = scores
+                else:
+                    total = {key: total[key] + score for key, score in scores.items() if key in total}
+                if not total:
+                    return []
+
+            # The card or title that is exactly the query goes first
+            for key in self._phrases.get(phrase, ()):
+                if key in total:
+                    total[key] += 1.0
+
+            best = heapq.nsmallest(count, total.items(), key=lambda item: (-item[1], KINDS.index(item[0][0]), item[0][1]))
+            return [(kind, doc_id, score) for (kind, doc_id), score in best]
+
+    def stats(self):
+        with self._lock:
+            return {'documents': len(self._docs), 'tokens': len(self._postings)}
+
+
+def _index_expression(model, name):
+    """The indexed expression of a model index, so queries match it exactly"""
+    return next(index for index in model.__table__.indexes if index.name == name).expressions[0]
+
+
+def _search_postgres(terms, kinds, count, offset):
+    """Ranked matches from the GIN full-text and trigram indexes"""
+    phrase = ' '.join(terms)
+    query = func.to_tsquery(literal_column("'simple'"), ' & '.join(f'{term}:*' for term in terms))
+    selects = []
+    if 'vocabulary' in kinds:
+        document = _index_expression(Vocabulary, 'ix_vocabulary_search')
+        word = func.lower(Vocabulary.word)
+        score = (func.ts_rank_cd(document, query) + func.similarity(word, phrase)
+                 + case((word == phrase, 1.0), else_=0.0))
+        selects.append(
+            select(literal('vocabulary').label('kind'), Vocabulary.id.label('id'), score.label('score'))
+            .where(or_(document.op('@@')(query), word.op('%')(phrase)))
+        )
+    if 'lesson' in kinds:
+        document = _index_expression(Lesson, 'ix_lesson_search')
+        score = func.ts_rank_cd(document, query) + case((func.lower(Lesson.title) == phrase, 1.0), else_=0.0)
+        selects.append(
+            select(literal('lesson').label('kind'), Lesson.id.label('id'), score.label('score'))
+            .where(document.op('@@')(query))
+        )
+    matches = union_all(*selects).subquery()
+    stmt = (
+        select(matches.c.kind, matches.c.id, matches.c.score)
+        .order_by(matches.c.score.desc(), matches.c.kind.desc(), matches.c.id)
+        .offset(offset).limit(count)
+    )
+    return [tuple(row) for row in db.session.connection().execute(stmt)]
+
+
+def make_snippet(text, terms):
+    """About SNIPPET_CHARS characters of text around the first matched term"""
+    lowered = text.lower()
+    positions = [p for p in (lowered.find(term) for term in terms) if p >= 0]
+    start = max(0, min(positions) - 40) if positions else 0
+    if start:
+        start = lowered.rfind(' ', 0, start) + 1
+    snippet = ' '.join(text[start:start + SNIPPET_CHARS].split())
+    return ('…' if start else '') + snippet + ('…' if start + SNIPPET_CHARS < len(text) else '')
+
+
+def _load_items(hits, terms):
+    """Result rows for a page of (kind, id, score) hits, in hit order"""
+    rows = {}
+    for kind in KINDS:
+        ids = [doc_id for hit_kind, doc_id, _score in hits if hit_kind == kind]
+        if not ids:
+            continue
+        model = SOURCES[kind][0]
+        columns = [getattr(model, name) for name in RESULT_FIELDS[kind]]
+        for row in db.session.connection().execute(select(*columns).where(model.id.in_(ids))):
+            rows[(kind, row.id)] = dict(row._mapping)
+
+    items = []
+    for kind, doc_id, score in hits:
+        item = rows.get((kind, doc_id))
+        if item is None:
+            continue  # Deleted since it was indexed
+        if kind == 'lesson':
+            item['snippet'] = make_snippet(item.pop('content'), terms)
+        items.append(dict(item, type=kind, score=round(float(score), 4)))
+    return items
+
+
+index = InvertedIndex()
+
+
+def search(query, kinds=KINDS, limit=20, offset=0):
+    """
+    Relevance-ranked search over saved vocabulary and lessons.
+
+    Every query word must match a word of the document or be a prefix
+    of one (type-ahead). PostgreSQL answers from GIN indexes; other
+    databases use the in-process InvertedIndex. Returns (items, offset
+    of the next page or None).
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_TERMS]
+    if not terms:
+        return [], None
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        hits = _search_postgres(terms, kinds, limit + 1, offset)
+    else:
+        index.sync()
+        hits = index.search(terms, kinds, offset + limit + 1)[offset:]
+
+    next_offset = offset + limit if len(hits) > limit else None
+    return _load_items(hits[:limit], terms), next_offset
@@ -0,0 +1,67 @@
+import gzip
+import json
+from datetime import date, datetime
+
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:  # Optional - falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional - gzip is always available
+    brotli = None
+
+# Bodies smaller than this aren't worth compressing
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4  # Fast setting; high qualities are meant for static assets
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(obj):
+    """Encode to JSON bytes; datetimes become ISO 8601 strings, as in to_dict()"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def rows_to_dicts(rows, fields):
+    """Core result rows (tuples) to dicts of the given fields, without ORM instances"""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def negotiate_encoding():
+    """Best Content-Encoding we can produce for the current request, or None"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def json_response(obj, status=200):
+    """JSON response encoded by dumps(), compressed when the client accepts it"""
+    body = dumps(obj)
+    response = Response(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+
+    encoding = negotiate_encoding() if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding:
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import InflightCall
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DatabaseLease:
+    """
+    Cross-worker leader election through the InflightCall table.
+
+    The worker that inserts the row for a key is the leader; the others
+    poll until the leader's result becomes visible or its lease expires.
+    """
+
+    def __init__(self, ttl=30, poll_interval=0.05):
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.owner = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+    @staticmethod
+    def _db_key(key):
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def acquire(self, key):
+        db_key = self._db_key(key)
+        now = datetime.utcnow()
+        for _attempt in range(2):
+            try:
+                db.session.add(InflightCall(key=db_key, owner=self.owner,
+                                            expires_at=now + timedelta(seconds=self.ttl)))
+                db.session.commit()
+                return True
+            except IntegrityError:
+                db.session.rollback()
+            # Take over a lease whose holder died
+            removed = InflightCall.query.filter(
+                InflightCall.key == db_key,
+                InflightCall.expires_at < now
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            if not removed:
+                return False
+        return False
+
+    def release(self, key):
+        try:
+            InflightCall.query.filter_by(key=self._db_key(key), owner=self.owner).delete(
+                synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+
+    def wait(self, key, check):
+        """Poll ``check`` until it returns a value or the leader's lease is gone"""
+        db_key = self._db_key(key)
+        deadline = time.monotonic() + self.ttl
+        while time.monotonic() < deadline:
+            result = check()
+            if result is not None:
+                return result
+            lease = db.session.query(InflightCall.expires_at).filter_by(key=db_key).first()
+            db.session.rollback()  # End the read transaction so the next poll sees new commits
+            if lease is None or lease.expires_at < datetime.utcnow():
+                return check()
+            time.sleep(self.poll_interval)
+        return None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one execution.
+
+    Within a process, followers block on the leader's call and share its
+    result or exception. With a ``DatabaseLease`` the same is done across
+    workers, for results that the leader publishes somewhere ``check``
+    can see them (the translation cache table, the TTS cache directory).
+    """
+
+    def __init__(self, lease=None):
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, check=None):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn, check)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run(self, key, fn, check):
+        if self.lease is None or check is None:
+            return fn()
+
+        if not self.lease.acquire(key):
+            result = self.lease.wait(key, check)
+            if result is not None:
+                with self._lock:
+                    self.coalesced += 1
+                return result
+            # Leader failed or timed out - do the work ourselves
+            return fn()
+
+        try:
+            return fn()
+        finally:
+            self.lease.release(key)
+
+    def stats(self):
+        return {
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._calls)
+        }
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+# SM-2 spaced repetition. Answer quality is graded 0 (blackout) to 5 (perfect);
+# 3 and above counts as recalled.
+MIN_EASE = 1.3
+DEFAULT_EASE = 2.5
+PASSING_QUALITY = 3
+
+# Quality recorded for practice results that only report right/wrong
+QUALITY_CORRECT = 4
+QUALITY_INCORRECT = 1
+QUALITY_REVIEWED = 4  # Flashcard "mark as reviewed"
+
+# Repeated drilling would otherwise grow intervals without bound
+MAX_INTERVAL_DAYS = 36500
+
+# Failed cards come back within the same session instead of tomorrow
+RELEARN_DELAY = timedelta(minutes=10)
+
+
+def quality_from_result(correct):
+    """Map a right/wrong practice answer to an SM-2 quality"""
+    return QUALITY_CORRECT if correct else QUALITY_INCORRECT
+
+
+def parse_quality(value, default):
+    """Validate a client-supplied quality (0-5); raises ValueError"""
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 5:
+        raise ValueError('quality must be an integer from 0 to 5')
+    return value
+
+
+def next_schedule(ease, interval_days, repetitions, quality, now=None):
+    """
+    Compute the next SM-2 state for a card.
+
+    Returns (ease, interval_days, repetitions, next_due).
+    """
+    now = now or datetime.utcnow()
+    ease = ease or DEFAULT_EASE
+    interval_days = interval_days or 0
+    repetitions = repetitions or 0
+
+    if quality < PASSING_QUALITY:
+        repetitions = 0
+        interval_days = 0
+        next_due = now + RELEARN_DELAY
+    else:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = min(MAX_INTERVAL_DAYS, max(1, round(interval_days * ease)))
+        repetitions += 1
+        next_due = now + timedelta(days=interval_days)
+
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ease, interval_days, repetitions, next_due
+
@@ -1,5 +1,58 @@
 import re
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Pattern for vocabulary: Word /phonetic/: Translation
+# Examples:
+# Self-invocation /self ɪnvəˈkeɪʃn/: Tự gọi chính mình.
+# Bypass /baɪˈpæs/: Bỏ qua, đi vòng qua (Bypass the proxy).
+VOCAB_LINE_PATTERN = re.compile(
+    r'^([A-Za-z][\w\s\-\']+?)\s*'  # Word (starts with letter, can have spaces/hyphens)
+    r'/([^/]+)/\s*'                 # /phonetic/
+    r'[:\-–]\s*'                    # separator (: or - or –)
+    r'(.+)$',                       # Translation
+    re.UNICODE
+)
+
+# Pattern for example sentences: "English sentence" (Vietnamese translation)
+EXAMPLE_LINE_PATTERN = re.compile(
+    r'^["\"](.+?)["\"]'             # "English sentence"
+    r'\s*'
+    r'[\(\（](.+?)[\)\）]',          # (Vietnamese translation)
+    re.UNICODE
+)
+
+# Same two entries, found anywhere in a line
+VOCAB_PATTERN = re.compile(
+    r'([A-Za-z][\w\s\-\']*?)\s*/([^/]+)/\s*[:\-–]\s*([^\n]+)',
+    re.UNICODE
+)
+EXAMPLE_PATTERN = re.compile(
+    r'["\"]([^"\""]+)["\"]'
+    r'\s*'
+    r'[\(\（]([^)\）]+)[\)\）]',
+    re.UNICODE
+)
+
+# Trailing "(context)" of a translation
+CONTEXT_PATTERN = re.compile(r'\(([^)]+)\)\s*\.?\s*$')
+
+# Word tokens used to match examples to entries on word boundaries
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:'[^\W_]+)*", re.UNICODE)
+
+
+def tokenize(text: str) -> tuple:
+    """Lower-cased word tokens of text"""
+    return tuple(TOKEN_PATTERN.findall(text.lower()))
+
+
+def _split_context(translation_raw):
+    """Split 'Translation (context).' into (translation, context)"""
+    context_match = CONTEXT_PATTERN.search(translation_raw)
+    if not context_match:
+        return translation_raw, None
+    context = context_match.group(1).strip()
+    translation = translation_raw[:context_match.start()].strip().rstrip('.,')
+    return translation, context
 
 
 def parse_vocabulary_text(text: str) -> List[Dict]:
@@ -16,26 +69,6 @@ def parse_vocabulary_text(text: str) -> List[Dict]:
     results = []
     lines = text.strip().split('\n')
     
-    # Pattern for vocabulary: Word /phonetic/: Translation
-    # Examples:
-    # Self-invocation /self ɪnvəˈkeɪʃn/: Tự gọi chính mình.
-    # Bypass /baɪˈpæs/: Bỏ qua, đi vòng qua (Bypass the proxy).
-    vocab_pattern = re.compile(
-        r'^([A-Za-z][\w\s\-\']+?)\s*'  # Word (starts with letter, can have spaces/hyphens)
-        r'/([^/]+)/\s*'                 # /phonetic/
-        r'[:\-–]\s*'                    # separator (: or - or –)
-        r'(.+)$',                       # Translation
-        re.UNICODE
-    )
-    
-    # Pattern for example sentences: "English sentence" (Vietnamese translation)
-    example_pattern = re.compile(
-        r'^["\"](.+?)["\"]'             # "English sentence"
-        r'\s*'
-        r'[\(\（](.+?)[\)\）]',          # (Vietnamese translation)
-        re.UNICODE
-    )
-    
     current_vocab = None
     
     for line in lines:
@@ -44,7 +77,7 @@ def parse_vocabulary_text(text: str) -> List[Dict]:
             continue
         
         # Try to match vocabulary pattern
-        vocab_match = vocab_pattern.match(line)
+        vocab_match = VOCAB_LINE_PATTERN.match(line)
         if vocab_match:
             # Save previous vocab if exists
             if current_vocab:
@@ -55,13 +88,7 @@ def parse_vocabulary_text(text: str) -> List[Dict]:
             translation_part = vocab_match.group(3).strip()
             
             # Extract context from translation if present (text in parentheses)
-            context_match = re.search(r'\(([^)]+)\)\s*\.?\s*$', translation_part)
-            context = None
-            translation = translation_part
-            
-            if context_match:
-                context = context_match.group(1).strip()
-                translation = translation_part[:context_match.start()].strip().rstrip('.,')
+            translation, context = _split_context(translation_part)
             
             current_vocab = {
                 'word': word,
@@ -74,7 +101,7 @@ def parse_vocabulary_text(text: str) -> List[Dict]:
             continue
         
         # Try to match example sentence pattern
-        example_match = example_pattern.match(line)
+        example_match = EXAMPLE_LINE_PATTERN.match(line)
         if example_match and current_vocab:
             current_vocab['example_en'] = example_match.group(1).strip()
             current_vocab['example_vi'] = example_match.group(2).strip()
@@ -87,6 +114,164 @@ def parse_vocabulary_text(text: str) -> List[Dict]:
     return results
 
 
+class _ExampleMatcher:
+    """
+    Associates examples with vocabulary entries as both stream in.
+
+    An entry gets the first example, in text order, that contains the
+    entry's word as a whole-word token sequence ("cat" matches "The cat
+    sat" but not "education"). Examples are indexed by token and pending
+    entries by their first token, so each entry and each example is
+    associated in one pass instead of scanning every pair.
+    """
+
+    def __init__(self):
+        self.examples = []        # (en, vi) in text order
+        self.example_tokens = []  # token tuple per example
+        self.postings = {}        # token -> example ids, ascending
+        self.pending = {}         # first token -> [(seq, tokens, entry)] still waiting
+        self.seq = 0
+        self.used = set()         # (en, vi) pairs given to an entry
+
+    @staticmethod
+    def _contains(haystack, needle):
+        first = needle[0]
+        n = len(needle)
+        for i, token in enumerate(haystack):
+            if token == first and haystack[i:i + n] == needle:
+                return True
+        return False
+
+    def _assign(self, entry, example_id):
+        en, vi = self.examples[example_id]
+        entry['example_en'] = en
+        entry['example_vi'] = vi
+        self.used.add((en, vi))
+
+    def add_entry(self, entry):
+        """Returns True if the entry already has its example"""
+        seq = self.seq
+        self.seq += 1
+        tokens = tokenize(entry['word'])
+        if not tokens:
+            self.pending.setdefault('', []).append((seq, tokens, entry))
+            return False
+
+        # Walk the shortest posting list; every match must contain all tokens
+        candidates = min((self.postings.get(token, ()) for token in tokens), key=len)
+        for example_id in candidates:
+            if len(tokens) == 1 or self._contains(self.example_tokens[example_id], tokens):
+                self._assign(entry, example_id)
+                return True
+
+        self.pending.setdefault(tokens[0], []).append((seq, tokens, entry))
+        return False
+
+    def add_example(self, en, vi):
+        """Returns the pending entries this example completes"""
+        example_id = len(self.examples)
+        tokens = tokenize(en)
+        self.examples.append((en, vi))
+        self.example_tokens.append(tokens)
+
+        completed = []
+        for token in dict.fromkeys(tokens):
+            self.postings.setdefault(token, []).append(example_id)
+
+            waiting = self.pending.get(token)
+            if not waiting:
+                continue
+            still_waiting = []
+            for seq, entry_tokens, entry in waiting:
+                if len(entry_tokens) == 1 or self._contains(tokens, entry_tokens):
+                    self._assign(entry, example_id)
+                    completed.append(entry)
+                else:
+                    still_waiting.append((seq, entry_tokens, entry))
+            if still_waiting:
+                self.pending[token] = still_waiting
+            else:
+                del self.pending[token]
+        return completed
+
+    def unmatched_entries(self):
+        """Entries that never got an example, in text order"""
+        waiting = [item for items in self.pending.values() for item in items]
+        waiting.sort(key=lambda item: item[0])
+        return [entry for _seq, _tokens, entry in waiting]
+
+
+def iter_vocabulary_with_examples(lines: Iterable[str], ordered: bool = False) -> Iterator[Dict]:
+    """
+    Incremental engine behind parse_vocabulary_with_examples.
+
+    Consumes any iterable of lines (a list, a file, an upload stream)
+    and yields vocabulary entries as soon as they are complete, i.e. as
+    soon as their example sentence has been seen. Entries that never
+    get one follow once the input is exhausted, then unused examples as
+    standalone phrases. With ``ordered=True`` entries are yielded in
+    text order instead of completion order.
+    """
+    matcher = _ExampleMatcher()
+    ready = {}      # seq -> completed entry (ordered mode)
+    next_seq = 0
+    seq_of = {}     # id(entry) -> seq
+
+    def release(entries):
+        nonlocal next_seq
+        if not ordered:
+            yield from entries
+            return
+        for entry in entries:
+            ready[seq_of.pop(id(entry))] = entry
+        while next_seq in ready:
+            yield ready.pop(next_seq)
+            next_seq += 1
+
+    seq = 0
+    for line in lines:
+        if not line or line.isspace():
+            continue
+
+        # Cheap pre-checks - the patterns backtrack heavily on lines that can't match
+        vocab_matches = VOCAB_PATTERN.finditer(line) if '/' in line else ()
+        for match in vocab_matches:
+            translation, context = _split_context(match.group(3).strip())
+            entry = {
+                'word': match.group(1).strip(),
+                'phonetic': match.group(2).strip(),
+                'translation': translation,
+                'context': context,
+                'example_en': None,
+                'example_vi': None
+            }
+            seq_of[id(entry)] = seq
+            seq += 1
+            if matcher.add_entry(entry):
+                yield from release([entry])
+
+        example_matches = EXAMPLE_PATTERN.finditer(line) if '"' in line else ()
+        for match in example_matches:
+            completed = matcher.add_example(match.group(1).strip(), match.group(2).strip())
+            if completed:
+                yield from release(completed)
+
+    # Entries without an example sentence
+    yield from release(matcher.unmatched_entries())
+
+    # Examples not associated with any entry become phrase entries
+    for en, vi in matcher.examples:
+        if (en, vi) not in matcher.used:
+            yield {
+                'word': en,
+                'phonetic': None,
+                'translation': vi,
+                'context': 'Example sentence',
+                'example_en': en,
+                'example_vi': vi
+            }
+
+
 def parse_vocabulary_with_examples(text: str) -> List[Dict]:
     """
     Enhanced parser that also captures numbered items and example sentences.
@@ -98,74 +283,4 @@ def parse_vocabulary_with_examples(text: str) -> List[Dict]:
     2. Mẫu câu:
     "English sentence" (Vietnamese translation)
     """
-    results = []
-    
-    # First pass: extract vocabulary with phonetics
-    vocab_pattern = re.compile(
-        r'([A-Za-z][\w\s\-\']*?)\s*/([^/]+)/\s*[:\-–]\s*([^\n]+)',
-        re.UNICODE | re.MULTILINE
-    )
-    
-    for match in vocab_pattern.finditer(text):
-        word = match.group(1).strip()
-        phonetic = match.group(2).strip()
-        translation_raw = match.group(3).strip()
-        
-        # Clean translation - remove parenthetical context
-        context_match = re.search(r'\(([^)]+)\)\s*\.?\s*$', translation_raw)
-        context = None
-        translation = translation_raw
-        
-        if context_match:
-            context = context_match.group(1).strip()
-            translation = translation_raw[:context_match.start()].strip().rstrip('.,')
-        
-        results.append({
-            'word': word,
-            'phonetic': phonetic,
-            'translation': translation,
-            'context': context,
-            'example_en': None,
-            'example_vi': None
-        })
-    
-    # Second pass: extract example sentences
-    example_pattern = re.compile(
-        r'["\"]([^"\""]+)["\"]'
-        r'\s*'
-        r'[\(\（]([^)\）]+)[\)\）]',
-        re.UNICODE
-    )
-    
-    examples = []
-    for match in example_pattern.finditer(text):
-        examples.append({
-            'en': match.group(1).strip(),
-            'vi': match.group(2).strip()
-        })
-    
-    # Try to associate examples with vocabulary
-    # Simple heuristic: if example contains the word, associate it
-    for vocab in results:
-        word_lower = vocab['word'].lower()
-        for ex in examples:
-            if word_lower in ex['en'].lower() and not vocab['example_en']:
-                vocab['example_en'] = ex['en']
-                vocab['example_vi'] = ex['vi']
-                break
-    
-    # If we have standalone examples (not associated with vocab), add them as phrases
-    used_examples = {(v['example_en'], v['example_vi']) for v in results if v['example_en']}
-    for ex in examples:
-        if (ex['en'], ex['vi']) not in used_examples:
-            # Add as a phrase entry
-            results.append({
-                'word': ex['en'],
-                'phonetic': None,
-                'translation': ex['vi'],
-                'context': 'Example sentence',
-                'example_en': ex['en'],
-                'example_vi': ex['vi']
-            })
-    
-    return results
+    return list(iter_vocabulary_with_examples(text.splitlines(), ordered=True))
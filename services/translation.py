@@ -1,9 +1,373 @@
-from deep_translator import GoogleTranslator
+import hashlib
+import threading
+from datetime import datetime, timedelta
 
-def translate_text(text, source='en', target='vi'):
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import TranslationCache
+from services import dictionary, metrics
+from services.cache import LRUCache
+from services.normalization import normalize_term, surface_term
+from services.offload import UpstreamUnavailable, pool as upstream_pool
+from services.singleflight import SingleFlight, DatabaseLease
+from services.translation_client import TranslationClient, TranslationError, TranslationUnavailable
+
+# In-process tier, sized from config in init_app()
+memory_cache = LRUCache()
+
+# Google rejects requests above 5000 characters
+_settings = {'max_chars': 5000, 'db_ttl': None, 'deadline': None}
+
+# Batch items are joined with newlines into one upstream request
+_BATCH_SEPARATOR = '\n'
+
+# Long-lived upstream client, created in init_app()
+client = None
+
+# Concurrent identical lookups share one upstream call
+flight = SingleFlight()
+
+_stats_lock = threading.Lock()
+_stats = {'dictionary_hits': 0, 'db_hits': 0, 'db_misses': 0, 'upstream_calls': 0, 'upstream_errors': 0, 'stale_served': 0}
+
+
+def init_app(app):
+    """Configure the translation cache tiers and upstream client from app config"""
+    global client
+    memory_cache.configure(
+        maxsize=app.config.get('TRANSLATION_CACHE_SIZE', 10000),
+        ttl=app.config.get('TRANSLATION_CACHE_TTL')
+    )
+    _settings['max_chars'] = app.config.get('TRANSLATION_MAX_CHARS', 5000)
+    _settings['db_ttl'] = app.config.get('TRANSLATION_CACHE_DB_TTL')
+    _settings['deadline'] = app.config.get('TRANSLATION_DEADLINE')
+
+    flight.lease = DatabaseLease(
+        ttl=app.config.get('SINGLEFLIGHT_LEASE_TTL', 30)
+    ) if app.config.get('SINGLEFLIGHT_SHARED') else None
+
+    if client is not None:
+        client.close()
+    client = TranslationClient(
+        app.config['TRANSLATION_API_URL'],
+        timeout=app.config.get('TRANSLATION_TIMEOUT', 5.0),
+        max_concurrency=app.config.get('TRANSLATION_MAX_CONCURRENCY', 8),
+        pool_size=app.config.get('TRANSLATION_POOL_SIZE', 8),
+        failure_threshold=app.config.get('TRANSLATION_BREAKER_THRESHOLD', 5),
+        reset_timeout=app.config.get('TRANSLATION_BREAKER_RESET', 30)
+    )
+
+
+def _hash_text(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _count(name, n=1):
+    with _stats_lock:
+        _stats[name] += n
+
+
+def _call_client(text, source, target):
+    with metrics.upstream_timer('translate'):
+        return client.translate(text, source=source, target=target)
+
+
+def _translate_upstream(text, source, target):
+    _count('upstream_calls')
+    try:
+        # The HTTP round trip runs in the bounded upstream pool
+        return upstream_pool.call(lambda: _call_client(text, source, target), deadline=_settings['deadline'])
+    except UpstreamUnavailable as e:
+        _count('upstream_errors')
+        raise TranslationUnavailable(str(e)) from e
+    except TranslationError:
+        _count('upstream_errors')
+        raise
+
+
+def _is_fresh(created_at):
+    ttl = _settings['db_ttl']
+    return not ttl or created_at is None or created_at > datetime.utcnow() - timedelta(seconds=ttl)
+
+
+def _load_cached(source, target, normalized):
+    return TranslationCache.query.filter_by(
+        source=source, target=target, text_hash=_hash_text(normalized)
+    ).first()
+
+
+def _store_cached(source, target, normalized, translation):
+    # Refresh an expired row, or insert; another worker may win the insert - that is fine
     try:
-        translator = GoogleTranslator(source=source, target=target)
-        translation = translator.translate(text)
+        updated = TranslationCache.query.filter_by(
+            source=source, target=target, text_hash=_hash_text(normalized)
+        ).update({'translation': translation, 'created_at': datetime.utcnow()})
+        if not updated:
+            db.session.add(TranslationCache(
+                source=source,
+                target=target,
+                text_hash=_hash_text(normalized),
+                text=normalized,
+                translation=translation
+            ))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+
+
+def translate_text(text, source='en', target='vi'):
+    """
+    Translate text, consulting the offline dictionary, the in-process LRU
+    and then the shared TranslationCache table before calling Google.
+    While the provider is degraded, an expired cached value is served if
+    there is one.
+    """
+    # What the user typed is what gets translated and cached; only the
+    # dictionary is consulted by lemma ("Running," -> "run" if it's a headword)
+    normalized = surface_term(text)
+    key = (source, target, normalized)
+
+    if (source, target) == dictionary.LANGUAGES:
+        entry = dictionary.store.lookup(normalize_term(normalized))
+        if entry is not None:
+            _count('dictionary_hits')
+            return entry.translation
+
+    translation = memory_cache.get(key)
+    if translation is not None:
+        return translation
+
+    row = _load_cached(source, target, normalized)
+    if row is not None and _is_fresh(row.created_at):
+        _count('db_hits')
+        memory_cache.set(key, row.translation)
+        return row.translation
+    _count('db_misses')
+    stale = row.translation if row is not None else None
+
+    # Don't hold a pooled connection while waiting on the upstream call
+    db.session.rollback()
+
+    def fetch():
+        translation = _translate_upstream(normalized, source, target)
+        if translation:
+            _store_cached(source, target, normalized, translation)
+            memory_cache.set(key, translation)
         return translation
-    except Exception as e:
-        raise e
+
+    def published():
+        # Another worker's result, once it lands in the shared tier
+        fresh = _load_cached(source, target, normalized)
+        return fresh.translation if fresh is not None and _is_fresh(fresh.created_at) else None
+
+    try:
+        return flight.do(('translate',) + key, fetch, check=published)
+    except TranslationError:
+        if stale is None:
+            stale = memory_cache.get(key, allow_stale=True)
+        if stale is None:
+            raise
+        _count('stale_served')
+        return stale
+
+
+def _load_cached_many(source, target, normalized_texts):
+    """Look up many normalized texts with one IN query per chunk"""
+    found = {}
+    by_hash = {_hash_text(t): t for t in normalized_texts}
+    hashes = list(by_hash)
+    for i in range(0, len(hashes), 500):
+        rows = db.session.query(
+            TranslationCache.text_hash, TranslationCache.translation, TranslationCache.created_at
+        ).filter(
+            TranslationCache.source == source,
+            TranslationCache.target == target,
+            TranslationCache.text_hash.in_(hashes[i:i + 500])
+        ).all()
+        for text_hash, translation, created_at in rows:
+            found[by_hash[text_hash]] = (translation, created_at)
+    return found
+
+
+def _store_cached_many(source, target, translations, expired=()):
+    for normalized in expired:
+        if normalized in translations:
+            _store_cached(source, target, normalized, translations[normalized])
+    try:
+        for normalized, translation in translations.items():
+            if normalized in expired:
+                continue
+            db.session.add(TranslationCache(
+                source=source,
+                target=target,
+                text_hash=_hash_text(normalized),
+                text=normalized,
+                translation=translation
+            ))
+        db.session.commit()
+    except IntegrityError:
+        # Lost a race with another worker - store row by row instead
+        db.session.rollback()
+        for normalized, translation in translations.items():
+            if normalized not in expired:
+                _store_cached(source, target, normalized, translation)
+
+
+def _pack_chunks(texts, max_chars):
+    """Greedily pack texts into chunks whose joined length fits max_chars"""
+    chunks = []
+    current = []
+    size = 0
+    for text in texts:
+        extra = len(text) + (len(_BATCH_SEPARATOR) if current else 0)
+        if current and size + extra > max_chars:
+            chunks.append(current)
+            current = []
+            size = 0
+            extra = len(text)
+        current.append(text)
+        size += extra
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _translate_chunk(chunk, source, target):
+    """Translate a chunk in one upstream call, falling back to one call per item"""
+    if len(chunk) > 1:
+        translated = _translate_upstream(_BATCH_SEPARATOR.join(chunk), source, target)
+        parts = translated.split(_BATCH_SEPARATOR) if translated else []
+        if len(parts) == len(chunk):
+            return {text: part.strip() for text, part in zip(chunk, parts)}, {}
+
+    results = {}
+    errors = {}
+    for text in chunk:
+        try:
+            results[text] = _translate_upstream(text, source, target)
+        except TranslationError as e:
+            errors[text] = str(e)
+    return results, errors
+
+
+def translate_batch(texts, source='en', target='vi'):
+    """
+    Translate many texts at once.
+
+    Texts are deduplicated, answered from the dictionary and cache tiers where possible
+    and the remaining misses are packed into as few upstream calls as the
+    provider's per-request character limit allows. Items the provider
+    fails on are answered from expired cache entries when available.
+    Returns one result dict per input text, in the original order.
+    """
+    normalized_texts = [surface_term(t) if isinstance(t, str) else '' for t in texts]
+    unique = list(dict.fromkeys(t for t in normalized_texts if t))
+
+    translations = {}
+    errors = {}
+
+    if (source, target) == dictionary.LANGUAGES:
+        lemmas = {text: normalize_term(text) for text in unique}
+        entries = dictionary.store.lookup_many(set(lemmas.values()))
+        for text, lemma in lemmas.items():
+            if lemma in entries:
+                translations[text] = entries[lemma].translation
+        _count('dictionary_hits', len(translations))
+
+    misses = []
+    for text in unique:
+        if text in translations:
+            continue
+        translation = memory_cache.get((source, target, text))
+        if translation is not None:
+            translations[text] = translation
+        else:
+            misses.append(text)
+
+    stale = {}
+    if misses:
+        from_db = _load_cached_many(source, target, misses)
+        for text, (translation, created_at) in from_db.items():
+            if _is_fresh(created_at):
+                translations[text] = translation
+                memory_cache.set((source, target, text), translation)
+            else:
+                stale[text] = translation
+        misses = [t for t in misses if t not in translations]
+        _count('db_hits', len(from_db) - len(stale))
+        _count('db_misses', len(misses))
+
+        # Don't hold a pooled connection while waiting on upstream calls
+        db.session.rollback()
+
+    max_chars = _settings['max_chars']
+    for text in misses:
+        if len(text) > max_chars:
+            errors[text] = f'Text exceeds {max_chars} characters'
+    misses = [t for t in misses if t not in errors]
+
+    fresh = {}
+    for chunk in _pack_chunks(misses, max_chars):
+        try:
+            chunk_results, chunk_errors = _translate_chunk(chunk, source, target)
+        except TranslationError as e:
+            chunk_results, chunk_errors = {}, {text: str(e) for text in chunk}
+        fresh.update({t: tr for t, tr in chunk_results.items() if tr})
+        errors.update(chunk_errors)
+
+    for text in list(errors):
+        if text in stale:
+            translations[text] = stale[text]
+            _count('stale_served')
+        else:
+            cached = memory_cache.get((source, target, text), allow_stale=True)
+            if cached is not None:
+                translations[text] = cached
+                _count('stale_served')
+
+    if fresh:
+        _store_cached_many(source, target, fresh, expired=set(stale))
+        for text, translation in fresh.items():
+            memory_cache.set((source, target, text), translation)
+        translations.update(fresh)
+
+    results = []
+    for original, text in zip(texts, normalized_texts):
+        if not text:
+            results.append({'original': original, 'error': 'No text provided'})
+        elif text in translations:
+            results.append({'original': original, 'translation': translations[text]})
+        else:
+            results.append({'original': original, 'error': errors.get(text, 'Translation failed')})
+    return results
+
+
+def get_counters():
+    """Raw per-process counters (no database access)"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def get_cache_stats():
+    """Hit/miss counters for both cache tiers (per process)"""
+    stats = get_counters()
+    db_total = stats['db_hits'] + stats['db_misses']
+    return {
+        'dictionary': dict(dictionary.store.stats(), translations_served=stats['dictionary_hits']),
+        'memory': memory_cache.stats(),
+        'database': {
+            'hits': stats['db_hits'],
+            'misses': stats['db_misses'],
+            'hit_ratio': round(stats['db_hits'] / db_total, 4) if db_total else 0.0,
+            'entries': TranslationCache.query.count()
+        },
+        'upstream': {
+            'calls': stats['upstream_calls'],
+            'errors': stats['upstream_errors'],
+            'stale_served': stats['stale_served'],
+            'circuit': client.breaker.state if client else None,
+            'pool': upstream_pool.stats()
+        },
+        'singleflight': flight.stats()
+    }
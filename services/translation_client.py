@@ -0,0 +1,135 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TranslationError(Exception):
+    """The upstream translator failed or returned an unusable response"""
+
+
+class TranslationUnavailable(TranslationError):
+    """The upstream translator is degraded - the call was not attempted"""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after ``failure_threshold`` consecutive failures.
+    Open -> half-open after ``reset_timeout`` seconds, letting a single
+    probe call through; its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            # Half-open: only one probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_skipped(self):
+        """The allowed call never reached the provider; count nothing, free the probe slot"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class TranslationClient:
+    """
+    Long-lived client for the Google Translate web API.
+
+    Reuses a keep-alive HTTP session, bounds the number of concurrent
+    upstream calls, applies a timeout to every call and trips a circuit
+    breaker when the provider keeps failing.
+    """
+
+    def __init__(self, base_url, timeout=5.0, max_concurrency=8, pool_size=8,
+                 failure_threshold=5, reset_timeout=30):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def translate(self, text, source='en', target='vi'):
+        if not self.breaker.allow():
+            raise TranslationUnavailable('Translation service is temporarily unavailable')
+
+        # Waiting for a slot counts against the same deadline as the call. Running
+        # out of local slots says nothing about the provider, so the breaker ignores it
+        if not self._semaphore.acquire(timeout=self.timeout):
+            self.breaker.record_skipped()
+            raise TranslationUnavailable('Too many concurrent translation requests')
+
+        try:
+            response = self.session.post(
+                self.base_url,
+                params={'client': 'gtx', 'sl': source, 'tl': target, 'dt': 't'},
+                data={'q': text},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            translation = self._parse(response.json())
+        except (requests.RequestException, ValueError) as e:
+            self.breaker.record_failure()
+            raise TranslationError(f'Translation request failed: {e}') from e
+        finally:
+            self._semaphore.release()
+
+        self.breaker.record_success()
+        return translation
+
+    @staticmethod
+    def _parse(payload):
+        # [[["translated", "original", ...], ...], ...]
+        try:
+            return ''.join(segment[0] for segment in payload[0] if segment and segment[0])
+        except (IndexError, TypeError) as e:
+            raise ValueError('Unexpected response format') from e
+
+    def close(self):
+        self.session.close()
@@ -1,12 +1,291 @@
 from gtts import gTTS
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
 
-def generate_speech_audio(text, lang='en'):
+from flask import current_app, has_app_context
+
+from services import metrics
+from services.offload import pool as upstream_pool
+from services.singleflight import SingleFlight, DatabaseLease
+
+# On-disk audio cache, configured in init_app()
+_cache = {
+    'dir': os.path.join(tempfile.gettempdir(), 'study_english_tts'),
+    'max_bytes': 500 * 1024 * 1024,
+}
+# Upstream (Google TTS) settings - TTS_UPSTREAM_URL points gTTS at a local stub for testing
+_upstream = {'url': None, 'timeout': 10.0, 'deadline': None}
+# Chunks of one streamed text synthesized at the same time
+_stream = {'concurrency': 3}
+_size_lock = threading.Lock()
+_cache_bytes = None  # Approximate size of the cache directory, computed lazily
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+# Concurrent requests for the same audio share one synthesis
+flight = SingleFlight()
+
+# Don't rewrite mtime on every hit - once a minute is enough for LRU ordering
+_TOUCH_INTERVAL = 60
+
+# Files modified more recently than this are never evicted. A path returned
+# by get_speech_audio_path() was written or touched at most _TOUCH_INTERVAL
+# ago, so it can't be deleted before the caller opens it.
+_EVICT_GRACE = _TOUCH_INTERVAL + 30
+
+
+def init_app(app):
+    """Configure the TTS audio cache from app config"""
+    _cache['dir'] = app.config.get('TTS_CACHE_DIR') or _cache['dir']
+    _cache['max_bytes'] = app.config.get('TTS_CACHE_MAX_BYTES', _cache['max_bytes'])
+    os.makedirs(_cache['dir'], exist_ok=True)
+    _upstream['url'] = app.config.get('TTS_UPSTREAM_URL')
+    _upstream['timeout'] = app.config.get('TTS_TIMEOUT', _upstream['timeout'])
+    _upstream['deadline'] = app.config.get('TTS_DEADLINE')
+    _stream['concurrency'] = max(1, app.config.get('TTS_STREAM_CONCURRENCY', _stream['concurrency']))
+    flight.lease = DatabaseLease(
+        ttl=app.config.get('SINGLEFLIGHT_LEASE_TTL', 30)
+    ) if app.config.get('SINGLEFLIGHT_SHARED') else None
+
+
+def audio_cache_key(text, lang='en', slow=False):
+    """Content address of the rendered audio for (text, lang, slow)"""
+    payload = json.dumps([text, lang, bool(slow)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _cache_path(key):
+    # Two-level fan-out keeps directories small
+    return os.path.join(_cache['dir'], key[:2], key + '.mp3')
+
+
+class _ConfiguredTTS(gTTS):
+    """gTTS whose requests can be sent to another endpoint"""
+
+    def _prepare_requests(self):
+        prepared = super()._prepare_requests()
+        if _upstream['url']:
+            for request in prepared:
+                request.prepare_url(_upstream['url'], None)
+        return prepared
+
+
+def has_cached_audio(key):
+    """True if the audio for a cache key is already on disk"""
+    return os.path.exists(_cache_path(key))
+
+
+def _synthesize(text, lang, slow, fp):
+    tts = _ConfiguredTTS(text=text, lang=lang, slow=slow, timeout=_upstream['timeout'])
+    with metrics.upstream_timer('tts'):
+        tts.write_to_fp(fp)
+
+
+def _touch(path):
+    try:
+        if time.time() - os.path.getmtime(path) > _TOUCH_INTERVAL:
+            os.utime(path)
+    except OSError:
+        pass
+
+
+def _evict_if_needed(added_bytes):
+    """Remove least recently used files once the size budget is exceeded, sparing recently used ones"""
+    global _cache_bytes
+    with _size_lock:
+        if _cache_bytes is not None:
+            _cache_bytes += added_bytes
+            if _cache_bytes <= _cache['max_bytes']:
+                return
+
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(_cache['dir']):
+            for name in files:
+                if not name.endswith('.mp3'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+        # Evict down to 90% of the budget so we don't walk on every write
+        if total > _cache['max_bytes']:
+            target = _cache['max_bytes'] * 0.9
+            cutoff = time.time() - _EVICT_GRACE
+            entries.sort()
+            for mtime, size, path in entries:
+                if total <= target or mtime > cutoff:
+                    break
+                try:
+                    if os.stat(path).st_mtime > cutoff:
+                        continue  # Served since the walk above
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+        _cache_bytes = total
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_cache_stats():
+    """Disk cache hit/miss counters (per process) and approximate size"""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats['hits'] + stats['misses']
+    return {
+        'dir': _cache['dir'],
+        'max_bytes': _cache['max_bytes'],
+        'bytes': _cache_bytes,
+        'hits': stats['hits'],
+        'misses': stats['misses'],
+        'hit_ratio': round(stats['hits'] / total, 4) if total else 0.0,
+    }
+
+
+def get_speech_audio_path(text, lang='en', slow=False):
+    """
+    Return (path, key) of the cached MP3 for the given text,
+    synthesizing it through gTTS on a cache miss.
+    """
+    key = audio_cache_key(text, lang, slow)
+    path = _cache_path(key)
+
+    if os.path.exists(path):
+        _touch(path)
+        _count('hits')
+        return path, key
+    _count('misses')
+
+    def published():
+        return path if os.path.exists(path) else None
+
+    # A render that misses its deadline still finishes in the pool and fills the cache
+    flight.do(
+        ('tts', key),
+        lambda: upstream_pool.call(lambda: _render(text, lang, slow, path), deadline=_upstream['deadline']),
+        check=published
+    )
+    return path, key
+
+
+def _render(text, lang, slow, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            _synthesize(text, lang, slow, fp)
+        # Atomic publish - concurrent readers never see a partial file
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    _evict_if_needed(os.path.getsize(path))
+    return path
+
+
+def generate_speech_audio(text, lang='en', slow=False):
+    path, _key = get_speech_audio_path(text, lang, slow)
+    with open(path, 'rb') as f:
+        return io.BytesIO(f.read())
+
+
+# Sentence boundaries: terminal punctuation (optionally closed by a quote or
+# bracket) followed by whitespace, or a line break
+_SENTENCE_BREAK = re.compile(
+    r'(?:(?<=[.!?\u2026])|(?<=[.!?\u2026]["\'\u201d\u2019)\]]))\s+|\s*\n\s*'
+)
+_CLAUSE_BREAK = re.compile(r'(?<=[,;:])\s+')
+
+
+def _pack(pieces, limit):
+    """Greedily join pieces with spaces into strings of at most ``limit`` chars"""
+    packed = []
+    for piece in pieces:
+        if packed and len(packed[-1]) + 1 + len(piece) <= limit:
+            packed[-1] += ' ' + piece
+        else:
+            packed.append(piece)
+    return packed
+
+
+def split_sentences(text, max_chars=gTTS.GOOGLE_TTS_MAX_CHARS):
+    """
+    Split text into speakable chunks: one per sentence, with sentences
+    longer than ``max_chars`` broken at clause and then word boundaries.
+    The default limit is what gTTS sends per upstream request, so each
+    chunk costs a single round trip.
+    """
+    chunks = []
+    for sentence in _SENTENCE_BREAK.split(text):
+        sentence = ' '.join(sentence.split())
+        if not sentence:
+            continue
+        if not any(ch.isalnum() for ch in sentence):
+            # Stray punctuation has nothing to say - keep it with the previous sentence
+            if chunks:
+                chunks[-1] += sentence
+            continue
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+            continue
+        for clause in _pack(_CLAUSE_BREAK.split(sentence), max_chars):
+            chunks.extend([clause] if len(clause) <= max_chars else _pack(clause.split(' '), max_chars))
+    return chunks
+
+
+def iter_speech_chunks(text, lang='en', slow=False, concurrency=None):
+    """
+    Yield the MP3 audio of ``text`` one sentence chunk at a time, in order.
+
+    Up to ``concurrency`` chunks are synthesized in parallel, each through
+    get_speech_audio_path() so it is cached (and coalesced) on its own.
+    The first chunk is yielded as soon as it is ready while later ones are
+    still rendering. MP3 frames are self-contained, so the chunks can be
+    concatenated as-is - gTTS joins its own request parts the same way.
+    Errors from a chunk (e.g. UpstreamUnavailable) propagate to the caller.
+    """
+    chunks = split_sentences(text)
+    if not chunks:
+        return
+    concurrency = min(concurrency or _stream['concurrency'], len(chunks))
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def render(chunk):
+        if app is None:
+            return get_speech_audio_path(chunk, lang, slow)[0]
+        with app.app_context():
+            return get_speech_audio_path(chunk, lang, slow)[0]
+
+    executor = ThreadPoolExecutor(concurrency, thread_name_prefix='tts-stream')
     try:
-        tts = gTTS(text=text, lang=lang, slow=False)
-        audio_buffer = io.BytesIO()
-        tts.write_to_fp(audio_buffer)
-        audio_buffer.seek(0)
-        return audio_buffer
-    except Exception as e:
-        raise e
+        remaining = iter(chunks)
+        in_flight = deque(executor.submit(render, chunk) for chunk, _ in zip(remaining, range(concurrency)))
+        while in_flight:
+            path = in_flight.popleft().result()
+            chunk = next(remaining, None)
+            if chunk is not None:
+                in_flight.append(executor.submit(render, chunk))
+            with open(path, 'rb') as f:
+                yield f.read()
+    finally:
+        # Client went away or a chunk failed - drop the chunks not started yet
+        executor.shutdown(wait=False, cancel_futures=True)
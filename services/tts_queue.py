@@ -0,0 +1,218 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from extensions import db
+from models import TtsJob
+from services import tts
+
+# Keys per IN (...) / rows per INSERT
+CHUNK_SIZE = 500
+
+
+def _insert_ignoring_duplicates(rows):
+    """Insert job rows, skipping keys another request queued concurrently"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        db.session.execute(pg_insert(TtsJob).values(rows).on_conflict_do_nothing())
+    elif dialect == 'sqlite':
+        db.session.execute(sqlite_insert(TtsJob).values(rows).on_conflict_do_nothing())
+    else:
+        db.session.execute(insert(TtsJob), rows)
+
+
+class TtsQueue:
+    """
+    Persistent queue of audio to pre-render into the TTS disk cache.
+
+    Jobs live in the TtsJob table, so they survive restarts and are
+    shared by all workers. Each process runs a few background threads
+    that claim jobs with a conditional UPDATE (attempts doubles as a
+    version number), render them through services.tts and retry
+    failures with exponential backoff. A job left 'running' by a dead
+    process is picked up again once its lease expires.
+    """
+
+    def __init__(self, workers=2, poll_interval=2.0, max_attempts=5, backoff=10, lease=300):
+        self.enabled = False
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self._app = None
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('TTS_PRERENDER_ENABLED', False)
+        self.workers = app.config.get('TTS_PRERENDER_WORKERS', self.workers)
+        self.max_attempts = app.config.get('TTS_PRERENDER_MAX_ATTEMPTS', self.max_attempts)
+        self.backoff = app.config.get('TTS_PRERENDER_BACKOFF', self.backoff)
+        self.poll_interval = app.config.get('TTS_PRERENDER_POLL_INTERVAL', self.poll_interval)
+        self._app = app
+        if self.enabled:
+            # Started with the first request, not at import - scripts importing app stay quiet
+            app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+                return
+            self._pid = os.getpid()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'tts-prerender-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def enqueue(self, texts, lang='en', slow=False):
+        """
+        Queue audio for texts that aren't cached yet. Runs in the caller's
+        transaction, so jobs are committed together with the data that
+        produced them. Returns the number of jobs queued.
+        """
+        if not self.enabled:
+            return 0
+
+        pending = {}
+        for text in texts:
+            text = (text or '').strip()
+            if not text:
+                continue
+            key = tts.audio_cache_key(text, lang, slow)
+            if key not in pending and not tts.has_cached_audio(key):
+                pending[key] = text
+        if not pending:
+            return 0
+
+        now = datetime.utcnow()
+        keys = list(pending)
+        queued = 0
+        for i in range(0, len(keys), CHUNK_SIZE):
+            chunk = keys[i:i + CHUNK_SIZE]
+            existing = dict(db.session.execute(
+                select(TtsJob.key, TtsJob.status).where(TtsJob.key.in_(chunk))
+            ).all())
+
+            rows = [
+                {'key': key, 'text': pending[key], 'lang': lang, 'slow': slow, 'status': 'pending',
+                 'attempts': 0, 'run_after': now, 'created_at': now, 'updated_at': now}
+                for key in chunk if key not in existing
+            ]
+            if rows:
+                _insert_ignoring_duplicates(rows)
+
+            # Rendered before, but the file has since been evicted
+            requeue = [key for key, status in existing.items() if status in ('done', 'failed')]
+            if requeue:
+                db.session.execute(
+                    update(TtsJob).where(TtsJob.key.in_(requeue))
+                    .values(status='pending', attempts=0, run_after=now, last_error=None, updated_at=now)
+                )
+            queued += len(rows) + len(requeue)
+
+        self._wake.set()
+        return queued
+
+    def _run(self):
+        while True:
+            try:
+                with self._app.app_context():
+                    job = self._claim()
+                    if job is not None:
+                        self._process(job)
+                        continue
+            except Exception:
+                self._app.logger.exception('TTS pre-render worker error')
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _claim(self):
+        """Take the next due job; returns it as a dict (attempts already counted) or None"""
+        now = datetime.utcnow()
+        columns = (TtsJob.id, TtsJob.key, TtsJob.text, TtsJob.lang, TtsJob.slow, TtsJob.status, TtsJob.attempts)
+        job = db.session.execute(
+            select(*columns).where(TtsJob.status == 'pending', TtsJob.run_after <= now)
+            .order_by(TtsJob.run_after).limit(1)
+        ).first()
+        if job is None:
+            # Lease expired - the process running it is gone
+            job = db.session.execute(
+                select(*columns).where(TtsJob.status == 'running', TtsJob.run_after <= now)
+                .order_by(TtsJob.run_after).limit(1)
+            ).first()
+        if job is None:
+            db.session.rollback()
+            return None
+
+        claimed = db.session.execute(
+            update(TtsJob)
+            .where(TtsJob.id == job.id, TtsJob.status == job.status, TtsJob.attempts == job.attempts)
+            .values(status='running', attempts=job.attempts + 1,
+                    run_after=now + timedelta(seconds=self.lease), updated_at=now)
+        ).rowcount
+        db.session.commit()
+        if claimed != 1:
+            return None  # Another worker got it first
+        return dict(job._mapping, attempts=job.attempts + 1)
+
+    def _process(self, job):
+        attempts = job['attempts']
+        values = {'updated_at': datetime.utcnow()}
+        try:
+            tts.get_speech_audio_path(job['text'], lang=job['lang'], slow=job['slow'])
+            values.update(status='done', last_error=None)
+        except Exception as e:
+            values['last_error'] = str(e)[:1000]
+            if attempts >= self.max_attempts:
+                values['status'] = 'failed'
+            else:
+                values['status'] = 'pending'
+                values['run_after'] = values['updated_at'] + timedelta(
+                    seconds=self.backoff * 2 ** (attempts - 1)
+                )
+
+        db.session.execute(
+            update(TtsJob)
+            .where(TtsJob.id == job['id'], TtsJob.status == 'running', TtsJob.attempts == attempts)
+            .values(**values)
+        )
+        db.session.commit()
+
+    def stats(self):
+        """Queue depth per status plus the age of the oldest pending job"""
+        counts = dict(db.session.execute(
+            select(TtsJob.status, func.count()).group_by(TtsJob.status)
+        ).all())
+        oldest = db.session.execute(
+            select(func.min(TtsJob.created_at)).where(TtsJob.status == 'pending')
+        ).scalar()
+        depth = counts.get('pending', 0) + counts.get('running', 0)
+        return {
+            'enabled': self.enabled,
+            'workers': self.workers if self._pid == os.getpid() else 0,
+            'depth': depth,
+            'pending': counts.get('pending', 0),
+            'running': counts.get('running', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'oldest_pending_seconds': round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else None,
+        }
+
+
+queue = TtsQueue()
+
+
+def init_app(app):
+    """Configure the TTS pre-render queue from app config"""
+    queue.init_app(app)
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from extensions import db
+from models import Lesson, TableVersion, Vocabulary
+
+# Tables whose API responses are served with ETags
+TRACKED_TABLES = (Lesson.__tablename__, Vocabulary.__tablename__)
+
+# Searchable vocabulary text (word, translation, examples). Bumped alongside
+# the table by paths that add, change or delete cards - not by practice
+# results - so the search index isn't re-read after every answer.
+VOCABULARY_TEXT = 'vocabulary_text'
+
+
+def ensure_versions():
+    """Create the counter rows so bump_version() is a plain UPDATE"""
+    existing = set(db.session.execute(select(TableVersion.name)).scalars())
+    for name in TRACKED_TABLES + (VOCABULARY_TEXT,):
+        if name not in existing:
+            db.session.add(TableVersion(name=name, version=0))
+    db.session.commit()
+
+
+def bump_version(*tables):
+    """
+    Mark tables as changed. Call inside the writing transaction, before
+    commit, so readers never see new data under an old version.
+    """
+    now = datetime.utcnow()
+    for name in tables:
+        result = db.session.execute(
+            update(TableVersion)
+            .where(TableVersion.name == name)
+            .values(version=TableVersion.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            db.session.add(TableVersion(name=name, version=1, updated_at=now))
+
+
+def get_versions(tables):
+    """{table: (version, updated_at)} in one primary-key lookup; missing rows are (0, None)"""
+    rows = db.session.execute(
+        select(TableVersion.name, TableVersion.version, TableVersion.updated_at)
+        .where(TableVersion.name.in_(tables))
+    )
+    versions = {name: (0, None) for name in tables}
+    versions.update((row.name, (row.version, row.updated_at)) for row in rows)
+    return versions
@@ -0,0 +1,129 @@
+from sqlalchemy import func, insert, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from extensions import db
+from models import Vocabulary
+from services.dictionary import store as dictionary
+from services.normalization import normalize_term
+from services.tts_queue import queue as tts_queue
+from services.versioning import VOCABULARY_TEXT, bump_version
+
+# Rows per INSERT / names per IN (...) - well below SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+_BULK_COLUMNS = ('phonetic', 'context', 'example_en', 'example_vi', 'level')
+
+
+def find_vocabulary_by_word(word):
+    """
+    Case-insensitive lookup through the unique lower(word) index, also
+    matching other inflections of the word through the lemma index
+    ("runs" finds a saved "run" when the dictionary confirms the lemma).
+    An exact match wins.
+    """
+    key = word.strip().lower()
+    matches = Vocabulary.query.filter(
+        or_(func.lower(Vocabulary.word) == key, Vocabulary.lemma == normalize_term(word))
+    ).all()
+    return next((v for v in matches if v.word.lower() == key), matches[0] if matches else None)
+
+
+def _existing_words(words, lemmas):
+    """
+    Return the (lower-cased) words and the lemmas among the given ones
+    that are already saved, one IN query per chunk.
+    """
+    existing_words = set()
+    existing_lemmas = set()
+    for i in range(0, len(words), CHUNK_SIZE):
+        rows = db.session.query(func.lower(Vocabulary.word), Vocabulary.lemma).filter(or_(
+            func.lower(Vocabulary.word).in_(words[i:i + CHUNK_SIZE]),
+            Vocabulary.lemma.in_(lemmas[i:i + CHUNK_SIZE])
+        )).all()
+        for word, lemma in rows:
+            existing_words.add(word)
+            existing_lemmas.add(lemma)
+    return existing_words, existing_lemmas
+
+
+def _insert_rows(rows):
+    """Insert rows in chunks; returns the set of words actually inserted"""
+    is_postgres = db.session.get_bind().dialect.name == 'postgresql'
+    inserted = set()
+    for i in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[i:i + CHUNK_SIZE]
+        if is_postgres:
+            stmt = pg_insert(Vocabulary).values(chunk).on_conflict_do_nothing().returning(Vocabulary.word)
+            inserted.update(word for (word,) in db.session.execute(stmt))
+        else:
+            db.session.execute(insert(Vocabulary), chunk)
+            inserted.update(row['word'] for row in chunk)
+    return inserted
+
+
+def bulk_import_vocabulary(items):
+    """
+    Save many vocabulary items with set-based queries.
+
+    Items are normalized and deduplicated in memory, existing words are
+    found with a single IN query per chunk, and the rest are written
+    through chunked Core inserts. Returns (saved, skipped) in the same
+    shape the bulk endpoint has always reported.
+    """
+    skipped = []  # (position in payload, entry)
+    pending = {}
+
+    for position, item in enumerate(items):
+        word = (item.get('word') or '').strip()
+        translation = (item.get('translation') or '').strip()
+
+        if not word or not translation:
+            continue
+
+        # Inflections of one word ("run", "runs") count as duplicates once the dictionary confirms the lemma
+        key = normalize_term(word)
+        if key in pending:
+            skipped.append((position, {'word': word, 'reason': 'Duplicate in request'}))
+            continue
+
+        row = {'word': word.lower(), 'lemma': key, 'translation': translation}
+        for column in _BULK_COLUMNS:
+            row[column] = item.get(column)
+        pending[key] = (position, word, row)
+
+    existing_words, existing_lemmas = _existing_words(
+        [row['word'] for _position, _word, row in pending.values()], list(pending)
+    )
+    rows = []
+    for key, (position, word, row) in pending.items():
+        if key in existing_lemmas or row['word'] in existing_words:
+            skipped.append((position, {'word': word, 'reason': 'Already exists'}))
+        else:
+            rows.append(row)
+
+    # Fill missing phonetics from the offline dictionary
+    entries = dictionary.lookup_many([row['word'] for row in rows if not row['phonetic']])
+    for row in rows:
+        if not row['phonetic'] and row['word'] in entries:
+            row['phonetic'] = entries[row['word']].phonetic
+
+    inserted = _insert_rows(rows) if rows else set()
+    if inserted:
+        bump_version(Vocabulary.__tablename__, VOCABULARY_TEXT)
+        # Pre-render audio so the new cards play instantly on first review
+        tts_queue.enqueue(
+            [row[field] for row in rows if row['word'] in inserted for field in ('word', 'example_en')]
+        )
+    db.session.commit()
+
+    saved = []
+    for row in rows:
+        position, word, _row = pending[row['lemma']]
+        if row['word'] in inserted:
+            saved.append(word)
+        else:
+            # Inserted concurrently by another request
+            skipped.append((position, {'word': word, 'reason': 'Already exists'}))
+
+    skipped.sort(key=lambda entry: entry[0])
+    return saved, [entry for _position, entry in skipped]
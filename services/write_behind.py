@@ -0,0 +1,173 @@
+import atexit
+import os
+import threading
+import uuid
+from datetime import datetime
+
+from extensions import db
+from services.practice import apply_practice_results
+from services.srs import next_schedule
+
+
+class ReviewBuffer:
+    """
+    Opt-in write-behind buffer for practice results.
+
+    Results are held in memory per card and written by a background
+    thread through apply_practice_results() - one transaction per flush
+    instead of one per flashcard flip. Pending results are flushed when
+    ``max_pending`` is reached, every ``flush_interval`` seconds and at
+    interpreter exit. Reads go through overlay() so responses already
+    include results that haven't been written yet.
+
+    Results pending in a worker are lost if it is killed without a clean
+    shutdown; leave the buffer disabled where that matters.
+    """
+
+    def __init__(self, flush_interval=5.0, max_pending=500):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.enabled = False
+        self._app = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = {}  # vocab_id -> [PracticeResult, ...] in answer order
+        self._flushing = {}  # Taken by the current flush, still shown by overlay() until committed
+        self._count = 0
+        self._thread = None
+        self._pid = None
+        self._flushes = 0
+        self._flushed_results = 0
+        self._errors = 0
+        self.generation = 0  # Changes whenever overlay() output may change
+        self._process_token = None  # (pid, random) - generations of different workers aren't comparable
+
+    def init_app(self, app):
+        self.enabled = app.config.get('WRITE_BEHIND_ENABLED', False)
+        self.flush_interval = app.config.get('WRITE_BEHIND_FLUSH_INTERVAL', self.flush_interval)
+        self.max_pending = app.config.get('WRITE_BEHIND_MAX_PENDING', self.max_pending)
+        self._app = app
+        if self.enabled:
+            atexit.register(self.flush)
+
+    def _ensure_thread(self):
+        # Started lazily so each forked worker gets its own flusher
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='review-write-behind', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def add(self, results):
+        """Queue results stamped with the current time"""
+        now = datetime.utcnow()
+        with self._lock:
+            for result in results:
+                self._pending.setdefault(result.vocab_id, []).append(
+                    result._replace(answered_at=result.answered_at or now)
+                )
+            self._count += len(results)
+            self.generation += 1
+            full = self._count >= self.max_pending
+            self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write all pending results in one transaction; returns how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                count, self._count = self._count, 0
+                self._flushing = pending
+            if not pending:
+                return 0
+
+            results = [result for card in pending.values() for result in card]
+            try:
+                with self._app.app_context():
+                    apply_practice_results(results, commit=False)
+                    # Commit and stop overlaying under one lock: a read sees these
+                    # results either in the rows or in the overlay, never in both
+                    with self._lock:
+                        db.session.commit()
+                        self._flushing = {}
+                        self._flushes += 1
+                        self._flushed_results += count
+            except Exception:
+                self._app.logger.exception('Write-behind flush of %d practice results failed', count)
+                with self._lock:
+                    # Put them back ahead of anything queued meanwhile
+                    for vocab_id, card in pending.items():
+                        self._pending[vocab_id] = card + self._pending.get(vocab_id, [])
+                    self._count += count
+                    self._flushing = {}
+                    self._errors += 1
+                return 0
+            return count
+
+    def etag_key(self):
+        """
+        Part of API ETags covering overlay() output. Every worker counts
+        generations from 0 over its own pending results, so the key also
+        identifies the process; empty while the buffer is disabled.
+        """
+        if not self.enabled:
+            return ()
+        pid = os.getpid()
+        if self._process_token is None or self._process_token[0] != pid:
+            self._process_token = (pid, uuid.uuid4().hex[:8])
+        return self._process_token + (self.generation,)
+
+    def overlay(self, item):
+        """Apply pending results to a vocabulary item dict (from fetch_page or to_dict) in place"""
+        with self._lock:
+            card = self._flushing.get(item.get('id'), []) + self._pending.get(item.get('id'), [])
+        if not card:
+            return item
+
+        increments = {
+            'review_count': len(card),
+            'typing_correct': sum(1 for r in card if r.kind == 'typing' and r.correct),
+            'speech_correct': sum(1 for r in card if r.kind == 'speech' and r.correct),
+        }
+        for column, increment in increments.items():
+            if column in item:
+                item[column] = (item[column] or 0) + increment
+        if 'last_reviewed' in item:
+            item['last_reviewed'] = card[-1].answered_at
+
+        srs = ('ease', 'interval_days', 'repetitions', 'next_due')
+        if all(column in item for column in srs):
+            ease, interval_days, repetitions = item['ease'], item['interval_days'], item['repetitions']
+            for result in card:
+                ease, interval_days, repetitions, next_due = next_schedule(
+                    ease, interval_days, repetitions, result.quality, result.answered_at
+                )
+            item.update(ease=ease, interval_days=interval_days, repetitions=repetitions, next_due=next_due)
+        return item
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'pending': self._count,
+                'flushes': self._flushes,
+                'flushed_results': self._flushed_results,
+                'errors': self._errors,
+            }
+
+
+review_buffer = ReviewBuffer()
+
+
+def init_app(app):
+    """Configure the review write-behind buffer from app config"""
+    review_buffer.init_app(app)
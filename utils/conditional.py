@@ -0,0 +1,60 @@
+import hashlib
+from functools import wraps
+
+from flask import make_response, request
+
+from services.versioning import get_versions
+
+
+def _etag(versions, extra):
+    # Compressed and identity bodies are different representations
+    parts = [request.full_path, request.headers.get('Accept-Encoding', '')]
+    for name in sorted(versions):
+        version, updated_at = versions[name]
+        # updated_at guards against a counter that restarts after the table is recreated
+        parts.append(f"{name}:{version}:{updated_at.isoformat() if updated_at else ''}")
+    parts.extend(str(value) for value in extra)
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+
+def conditional_get(*tables, extra=None):
+    """
+    Serve a GET endpoint with a strong ETag derived from table versions.
+
+    The ETag covers the versions of ``tables``, the full request URL and
+    whatever ``extra()`` returns. A matching If-None-Match (or an
+    If-Modified-Since no older than the last change, unless ``extra()``
+    returned something the date can't reflect) is answered with 304
+    before the view runs, so no query or serialization happens.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = get_versions(tables)
+            extra_values = extra() if extra else ()
+            etag = _etag(versions, extra_values)
+            changed = [updated_at for _version, updated_at in versions.values() if updated_at]
+            last_modified = max(changed).replace(microsecond=0) if changed else None
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            elif extra_values:
+                not_modified = False
+            else:
+                since = request.if_modified_since
+                not_modified = bool(since and last_modified and last_modified <= since.replace(tzinfo=None))
+
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            # Cacheable, but always revalidated
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,148 @@
+import base64
+import json
+from datetime import datetime
+from urllib.parse import urlencode
+
+from flask import request
+from sqlalchemy import select, tuple_
+
+from extensions import db
+from services.serialization import json_response, rows_to_dicts
+
+MAX_PAGE_SIZE = 1000
+
+
+def _to_json(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_cursor(values):
+    """Opaque cursor for the sort-key values of the last row of a page"""
+    raw = json.dumps([_to_json(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_values(cursor, count):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != count:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor back into values typed like the given columns"""
+    values = _decode_values(cursor, len(columns))
+
+    decoded = []
+    for column, value in zip(columns, values):
+        python_type = column.type.python_type
+        # Sort keys are never NULL; a bool is not an id even though it is an int
+        if isinstance(value, bool) or not isinstance(value, str if python_type is datetime else python_type):
+            raise ValueError('Invalid cursor')
+        if python_type is datetime:
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError('Invalid cursor')
+        decoded.append(value)
+    return decoded
+
+
+def parse_fields(model, default=None):
+    """Column names requested through ?fields=a,b,c (all columns by default)"""
+    available = [column.name for column in model.__table__.columns]
+    requested = request.args.get('fields')
+    if not requested:
+        return list(default or available)
+    fields = [f.strip() for f in requested.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def decode_offset(cursor):
+    """
+    Row offset from a cursor made with encode_cursor([offset]). Used for
+    relevance-ranked results, which have no stable keyset to page on.
+    """
+    if not cursor:
+        return 0
+    (offset,) = _decode_values(cursor, 1)
+    if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0:
+        raise ValueError('Invalid cursor')
+    return offset
+
+
+def parse_limit(default=None):
+    """Page size from ?limit=, or ``default`` (None for the whole result)"""
+    limit = request.args.get('limit')
+    if limit is None:
+        return default
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def build_page_query(model, fields, order_by, filters=(), descending=False, cursor=None, limit=None):
+    """
+    Projected, keyset-paginated select.
+
+    ``order_by`` is a tuple of columns whose last element is unique
+    (e.g. (created_at, id)); the page starts strictly after ``cursor``.
+    One extra row is fetched to tell whether there is a next page.
+    """
+    columns = [getattr(model, name) for name in fields]
+    extra = [col for col in order_by if col.key not in fields]
+    stmt = select(*columns, *extra).where(*filters)
+
+    if cursor:
+        position = tuple_(*order_by)
+        values = tuple_(*decode_cursor(cursor, order_by))
+        stmt = stmt.where(position < values if descending else position > values)
+
+    stmt = stmt.order_by(*[col.desc() if descending else col.asc() for col in order_by])
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    return stmt
+
+
+def fetch_page(model, fields, order_by, filters=(), descending=False, default_limit=None):
+    """
+    Run build_page_query for the current request.
+
+    Returns (rows as plain dicts, next cursor or None); values are left
+    as Python objects for page_response() to encode in one pass.
+    """
+    limit = parse_limit(default_limit)
+    stmt = build_page_query(model, fields, order_by, filters, descending,
+                            cursor=request.args.get('cursor'), limit=limit)
+    # Core execution - column selects don't need the ORM's row processing
+    rows = db.session.connection().execute(stmt).all()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]._mapping
+        next_cursor = encode_cursor([last[col.key] for col in order_by])
+
+    return rows_to_dicts(rows, fields), next_cursor
+
+
+def page_response(items, next_cursor):
+    """JSON array response; the next page is advertised through headers"""
+    response = json_response(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['Link'] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+    return response
@@ -0,0 +1,134 @@
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, inspect, select, text, update
+
+from extensions import db
+from models import Vocabulary
+from services.normalization import normalize_term
+from services.srs import DEFAULT_EASE
+from services.versioning import bump_version
+
+
+def _has_duplicate_words():
+    """True if saved words collide case-insensitively (blocks the unique index)"""
+    return db.session.query(func.lower(Vocabulary.word)).group_by(
+        func.lower(Vocabulary.word)
+    ).having(func.count() > 1).first() is not None
+
+
+def _index_names(inspector, table_name):
+    # SQLite reflection skips expression indexes such as lower(word)
+    if db.engine.dialect.name == 'sqlite':
+        rows = db.session.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"),
+            {'table': table_name}
+        )
+        return {name for (name,) in rows}
+    return {index['name'] for index in inspector.get_indexes(table_name)}
+
+
+def _add_missing_columns(inspector, table):
+    """ALTER TABLE ... ADD COLUMN for (nullable) columns added to a model; returns their names"""
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    preparer = db.engine.dialect.identifier_preparer
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        column_type = column.type.compile(dialect=db.engine.dialect)
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                f'ALTER TABLE {preparer.format_table(table)} '
+                f'ADD COLUMN {preparer.format_column(column)} {column_type}'
+            ))
+        print(f"Added column {table.name}.{column.name}")
+        added.append(column.name)
+    return added
+
+
+def _backfill_srs_state():
+    """Give cards saved before spaced repetition existed a fresh SM-2 state"""
+    result = db.session.execute(
+        update(Vocabulary)
+        .where(Vocabulary.next_due.is_(None))
+        .values(
+            ease=func.coalesce(Vocabulary.ease, DEFAULT_EASE),
+            interval_days=func.coalesce(Vocabulary.interval_days, 0),
+            repetitions=func.coalesce(Vocabulary.repetitions, 0),
+            next_due=func.coalesce(Vocabulary.created_at, datetime.utcnow()),
+        )
+    )
+    if result.rowcount:
+        bump_version(Vocabulary.__tablename__)
+        print(f"Scheduled {result.rowcount} existing vocabulary items for review")
+
+
+def recompute_lemmas(missing_only=False):
+    """
+    Store each saved word's lemma. With ``missing_only`` just the words
+    saved before duplicate detection used lemmas; otherwise every word,
+    since lemmas depend on the dictionary (run after it is rebuilt).
+    Returns the number of rows changed; the caller commits.
+    """
+    table = Vocabulary.__table__
+    stmt = select(table.c.id, table.c.word, table.c.lemma)
+    if missing_only:
+        stmt = stmt.where(table.c.lemma.is_(None))
+    changed = []
+    for vocab_id, word, lemma in db.session.execute(stmt):
+        new_lemma = normalize_term(word)
+        if new_lemma != lemma:
+            changed.append({'vocab_id': vocab_id, 'new_lemma': new_lemma})
+    if not changed:
+        return 0
+    db.session.execute(
+        update(table).where(table.c.id == bindparam('vocab_id')).values(lemma=bindparam('new_lemma')),
+        changed
+    )
+    bump_version(Vocabulary.__tablename__)
+    return len(changed)
+
+
+def ensure_extensions():
+    """PostgreSQL extensions the models' indexes rely on (trigram search); run before create_all()"""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    with db.engine.begin() as conn:
+        conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+
+
+def upgrade_schema():
+    """
+    Bring an existing database up to the current models.
+
+    ``db.create_all()`` only creates missing tables, so columns and
+    indexes added to existing tables are created here. Safe to run on
+    every start.
+    """
+    inspector = inspect(db.engine)
+
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        if _add_missing_columns(inspector, table) and table is Vocabulary.__table__:
+            _backfill_srs_state()
+            db.session.commit()
+        if table is Vocabulary.__table__:
+            count = recompute_lemmas(missing_only=True)
+            if count:
+                print(f"Computed lemmas for {count} existing vocabulary items")
+            db.session.commit()
+        existing = _index_names(inspector, table.name)
+
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if index.info.get('dialect', db.engine.dialect.name) != db.engine.dialect.name:
+                continue  # e.g. GIN search indexes on SQLite
+            if index.name == 'ix_vocabulary_word_lower' and _has_duplicate_words():
+                print(f"Skipping {index.name}: vocabulary has case-insensitive duplicate words")
+                continue
+            index.create(db.engine)
+            print(f"Created index {index.name}")
+
+    db.session.commit()
@@ -1,10 +1,16 @@
 from models import Lesson, Vocabulary
 from extensions import db
+from services.glossary import build_lesson_glossary
+from services.versioning import bump_version, ensure_versions
+from utils.schema import ensure_extensions, upgrade_schema
 
 def init_db(app):
     """Initialize database with sample lessons"""
     with app.app_context():
+        ensure_extensions()
         db.create_all()
+        upgrade_schema()
+        ensure_versions()
         
         # Check if lessons already exist
         if Lesson.query.first():
@@ -243,9 +249,27 @@ Remember that career paths are rarely straight. Many successful people have chan
         ]
         
         # Add all lessons to database
+        lessons = []
         for lesson_data in a1_lessons + a2_lessons + b1_lessons:
             lesson = Lesson(**lesson_data)
             db.session.add(lesson)
+            lessons.append(lesson)
         
+        bump_version(Lesson.__tablename__)
         db.session.commit()
         print("Database initialized with sample lessons!")
+        
+        if app.config.get('GLOSSARY_BUILD_ON_SEED'):
+            build_glossaries(lessons)
+
+
+def build_glossaries(lessons):
+    """Precompute hover glossaries; failures are retried lazily by the API"""
+    for lesson in lessons:
+        try:
+            glossary = build_lesson_glossary(lesson)
+            missing = f", {len(glossary.missing)} missing" if glossary.missing else ''
+            print(f"Glossary built for '{lesson.title}' ({len(glossary.entries)} words{missing})")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Glossary build failed for '{lesson.title}': {e}")